@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import OrderedDict
+
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+
+from users.models import User
+
+from .versions import bump_version, get_version, is_cache_shared
+
+
+def get_auth_version_name(key):
+    """Имя версии токена и данных его пользователя."""
+    return f"auth:{key}"
+
+
+def schedule_auth_changed(keys):
+    """Сбрасывает закэшированные токены после фиксации транзакции."""
+    names = [get_auth_version_name(key) for key in keys]
+
+    def bump_versions():
+        for name in names:
+            bump_version(name)
+
+    if names:
+        transaction.on_commit(bump_versions)
+
+
+def get_cached_fields():
+    """
+    Поля пользователя, которые хранятся в кэше токенов. Счётчики
+    не кэшируются: у пользователя из кэша они отложенные и читаются
+    из базы при обращении.
+    """
+    return [
+        field.attname
+        for field in User._meta.concrete_fields
+        if field.name not in User.counter_fields
+    ]
+
+
+class TokenCache:
+    """
+    Кэш токенов в памяти процесса: не больше TOKEN_CACHE_SIZE записей,
+    самые давно использованные вытесняются, запись живёт
+    TOKEN_CACHE_TTL секунд. Запись хранит поля пользователя и версию
+    токена на момент чтения из базы. Запись действительна, пока версия
+    не изменилась, поэтому удаление токена, сохранение пользователя
+    и смена пароля сбрасывают её сразу. Если
+    TOKEN_CACHE_SHARED включён, записи дополнительно хранятся в общем
+    кэше Django и доступны другим процессам.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get_shared_key(self, key):
+        return f"token:{key}"
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None and settings.TOKEN_CACHE_SHARED:
+            entry = cache.get(self.get_shared_key(key))
+            if entry is not None:
+                self._store(key, entry)
+        if entry is None:
+            return None
+        expires, version, created, values = entry
+        current = get_version(get_auth_version_name(key))
+        if expires < time.time() or current is None or version != current:
+            self.delete(key)
+            return None
+        return created, values
+
+    def set(self, key, version, token):
+        values = tuple(
+            getattr(token.user, attname) for attname in get_cached_fields()
+        )
+        entry = (
+            time.time() + settings.TOKEN_CACHE_TTL,
+            version,
+            token.created,
+            values,
+        )
+        self._store(key, entry)
+        if settings.TOKEN_CACHE_SHARED:
+            cache.set(
+                self.get_shared_key(key), entry, settings.TOKEN_CACHE_TTL
+            )
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.TOKEN_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        if settings.TOKEN_CACHE_SHARED:
+            cache.delete(self.get_shared_key(key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication, который читает токен и пользователя из
+    token_cache и обращается к базе только при промахе. Ошибки и
+    заголовки те же, что у TokenAuthentication. Пользователь каждого
+    запроса - отдельный объект, собранный из закэшированных полей.
+    Выход, смена пароля или деактивация в одном процессе должны
+    сбрасывать токен во всех, поэтому токены кэшируются, только если
+    кэш Django общий для процессов (is_cache_shared) и доступен.
+    """
+
+    def authenticate_credentials(self, key):
+        if not is_cache_shared():
+            return super().authenticate_credentials(key)
+        cached = token_cache.get(key)
+        if cached is not None:
+            created, values = cached
+            user = User.from_db(None, get_cached_fields(), values)
+            token = self.get_model()(key=key, user=user, created=created)
+            return user, token
+
+        # Версия читается до запроса к базе: если токен или пользователь
+        # изменятся после чтения, запись в кэше сразу будет устаревшей.
+        version = get_version(get_auth_version_name(key))
+        model = self.get_model()
+        try:
+            token = model.objects.select_related("user").get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _("User inactive or deleted.")
+            )
+
+        if version is not None:
+            token_cache.set(key, version, token)
+        return token.user, token
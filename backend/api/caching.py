@@ -0,0 +1,101 @@
+import hashlib
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlencode
+
+from rest_framework.response import Response
+
+from django.core.cache import cache
+
+from .versions import get_version, is_cache_shared
+
+
+class KeyLocks:
+    """
+    Блокировки по ключу. Пока блокировка ключа занята, остальные
+    потоки с тем же ключом ждут; после освобождения последним потоком
+    блокировка удаляется.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locks = {}
+
+    @contextmanager
+    def __call__(self, key):
+        with self._lock:
+            lock, count = self._locks.get(key, (None, 0))
+            if lock is None:
+                lock = threading.Lock()
+            self._locks[key] = (lock, count + 1)
+        try:
+            with lock:
+                yield
+        finally:
+            with self._lock:
+                lock, count = self._locks[key]
+                if count == 1:
+                    del self._locks[key]
+                else:
+                    self._locks[key] = (lock, count - 1)
+
+
+key_locks = KeyLocks()
+
+
+class AnonymousCacheMixin:
+    """
+    Кэширует ответы list и retrieve для анонимных пользователей.
+    Ключ - адрес запроса с отсортированными параметрами и текущие
+    версии cache_versions: при записи в связанные данные версия
+    увеличивается, и старые ответы больше не читаются. Если ответа
+    в кэше нет, его готовит один поток процесса, остальные запросы
+    с тем же ключом ждут и берут готовый ответ из кэша.
+    С кэшем процесса (LocMemCache) ответы не кэшируются: запись
+    в другом процессе не изменила бы версии этого процесса.
+    """
+
+    cache_versions = ()
+    cache_timeout = 300
+    cache_sorted_params = ()
+
+    def get_cache_key(self, request):
+        params = sorted(
+            (
+                key,
+                sorted(values) if key in self.cache_sorted_params else values,
+            )
+            for key, values in request.query_params.lists()
+        )
+        url = (
+            f"{request.scheme}://{request.get_host()}{request.path}"
+            f"?{urlencode(params, doseq=True)}"
+        )
+        versions = ":".join(
+            str(get_version(name)) for name in self.cache_versions
+        )
+        digest = hashlib.sha1(url.encode()).hexdigest()
+        return f"anonymous:{versions}:{digest}"
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        if request.user.is_authenticated or not is_cache_shared():
+            return handler(request, *args, **kwargs)
+        key = self.get_cache_key(request)
+        data = cache.get(key)
+        if data is None:
+            with key_locks(key):
+                data = cache.get(key)
+                if data is None:
+                    response = handler(request, *args, **kwargs)
+                    if response.status_code == 200:
+                        cache.set(key, response.data, self.cache_timeout)
+                    return response
+        return Response(data)
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
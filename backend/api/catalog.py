@@ -0,0 +1,170 @@
+import bisect
+import gzip
+import hashlib
+import threading
+import time
+from collections import namedtuple
+
+from rest_framework.renderers import JSONRenderer
+
+from django.core.cache import cache
+
+from recipe.models import Ingredient, Tag
+
+from .versions import TAGS_VERSION, get_version
+
+
+INGREDIENTS_VERSION = "ingredients"
+CATALOG_MAX_AGE = 300
+
+CatalogData = namedtuple(
+    "CatalogData",
+    ("keys", "items", "by_id", "content", "gzip_content", "etag"),
+)
+
+
+def fold(value):
+    """Приводит строку к виду для поиска: без регистра и с «е» вместо «ё»."""
+    return value.casefold().replace("ё", "е")
+
+
+class IngredientCatalog:
+    """
+    Справочник ингредиентов в памяти процесса.
+    Ингредиенты хранятся в списке, отсортированном по нормализованному
+    названию, поэтому поиск по началу названия - это бинарный поиск
+    и последовательное чтение совпадений. Справочник перечитывается
+    из базы, когда меняется версия INGREDIENTS_VERSION или истекает
+    CATALOG_MAX_AGE секунд. Полный список хранится также готовым
+    JSON-ответом, обычным и сжатым gzip, и его хэшем для ETag.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._loaded_at = 0
+        self._data = None
+
+    def _is_fresh(self, version):
+        return (
+            version == self._version
+            and time.monotonic() - self._loaded_at < CATALOG_MAX_AGE
+        )
+
+    def _get_data(self):
+        version = get_version(INGREDIENTS_VERSION)
+        if self._is_fresh(version):
+            return self._data
+        with self._lock:
+            if not self._is_fresh(version):
+                self._data = self._load()
+                self._version = version
+                self._loaded_at = time.monotonic()
+        return self._data
+
+    def _load(self):
+        items = sorted(
+            (
+                {"id": pk, "name": name, "measurement_unit": unit}
+                for pk, name, unit in Ingredient.objects.values_list(
+                    "id", "name", "measurement_unit"
+                )
+            ),
+            key=lambda item: (fold(item["name"]), item["id"]),
+        )
+        content = JSONRenderer().render(items)
+        return CatalogData(
+            keys=[fold(item["name"]) for item in items],
+            items=items,
+            by_id={item["id"]: item for item in items},
+            content=content,
+            gzip_content=gzip.compress(content, mtime=0),
+            etag=hashlib.sha1(content).hexdigest(),
+        )
+
+    def search(self, query="", limit=None):
+        """Ингредиенты, название которых начинается с query."""
+        data = self._get_data()
+        prefix = fold(query.strip())
+        result = []
+        start = bisect.bisect_left(data.keys, prefix)
+        for index in range(start, len(data.keys)):
+            if not data.keys[index].startswith(prefix):
+                break
+            result.append(data.items[index])
+            if limit and len(result) >= limit:
+                break
+        return result
+
+    def get(self, pk):
+        return self._get_data().by_id.get(pk)
+
+    def get_content(self, use_gzip=False):
+        """Полный список ингредиентов в виде готового JSON."""
+        data = self._get_data()
+        return data.gzip_content if use_gzip else data.content
+
+    def get_etag(self):
+        """Хэш полного списка: одинаков в процессах с одинаковыми данными."""
+        return self._get_data().etag
+
+    def get_missing_ids(self, ids):
+        """
+        Id из ids, которых нет в базе.
+        Id, не найденные в справочнике, перепроверяются запросом:
+        справочник другого процесса мог ещё не увидеть новый ингредиент.
+        """
+        by_id = self._get_data().by_id
+        missing = {pk for pk in ids if pk not in by_id}
+        if missing:
+            missing -= set(
+                Ingredient.objects.filter(pk__in=missing).values_list(
+                    "pk", flat=True
+                )
+            )
+        return missing
+
+
+class TagsSnapshot:
+    """
+    Хэш тэгов для ETag в памяти процесса. Он перечитывается, когда
+    меняется версия TAGS_VERSION или истекает CATALOG_MAX_AGE секунд,
+    поэтому условный запрос тэгов не обращается к базе. Хэш хранится
+    и в кэше под ключом с версией: процесс, который первым увидел новую
+    версию, считает хэш, остальные берут его из кэша.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._loaded_at = 0
+        self._etag = None
+
+    def _is_fresh(self, version):
+        return (
+            version == self._version
+            and time.monotonic() - self._loaded_at < CATALOG_MAX_AGE
+        )
+
+    def get_etag(self):
+        version = get_version(TAGS_VERSION)
+        if self._is_fresh(version):
+            return self._etag
+        with self._lock:
+            if not self._is_fresh(version):
+                key = f"tags-etag:{version}"
+                etag = cache.get(key)
+                if etag is None:
+                    rows = Tag.objects.order_by("id").values_list(
+                        "id", "name", "color", "slug"
+                    )
+                    etag = hashlib.sha1(repr(list(rows)).encode()).hexdigest()
+                    cache.set(key, etag, CATALOG_MAX_AGE)
+                self._etag = etag
+                self._version = version
+                self._loaded_at = time.monotonic()
+        return self._etag
+
+
+ingredient_catalog = IngredientCatalog()
+tags_snapshot = TagsSnapshot()
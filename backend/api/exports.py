@@ -0,0 +1,46 @@
+import csv
+import json
+
+
+class Echo:
+    """Буфер для csv.writer, который возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def export_txt(items):
+    for item in items:
+        yield (
+            f"{item['name']} ({item['measurement_unit']}) - "
+            f"{item['amount']}\n"
+        )
+
+
+def export_csv(items):
+    writer = csv.writer(Echo())
+    yield writer.writerow(("name", "measurement_unit", "amount"))
+    for item in items:
+        yield writer.writerow(
+            (item["name"], item["measurement_unit"], item["amount"])
+        )
+
+
+def export_json(items):
+    yield "["
+    for number, item in enumerate(items):
+        row = {
+            "name": item["name"],
+            "measurement_unit": item["measurement_unit"],
+            "amount": item["amount"],
+        }
+        yield ("," if number else "") + json.dumps(row, ensure_ascii=False)
+    yield "]"
+
+
+# Формат выгрузки списка покупок: (Content-Type, генератор частей ответа).
+EXPORT_FORMATS = {
+    "txt": ("text/plain; charset=utf-8", export_txt),
+    "csv": ("text/csv; charset=utf-8", export_csv),
+    "json": ("application/json", export_json),
+}
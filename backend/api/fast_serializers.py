@@ -0,0 +1,165 @@
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
+
+from recipe.images import IMAGE_VARIANTS
+from recipe.models import Recipe, RecipeIngredient
+
+from .pagination import PageLimitPagination
+from .serializers import RecipeSerializer
+
+
+AUTHOR_VALUES = (
+    "author__email",
+    "author__username",
+    "author__first_name",
+    "author__last_name",
+)
+
+
+class RecipeRowSerializer:
+    """
+    Сериализация рецептов только для чтения из строк values():
+    рецепт с автором - одним запросом, теги и ингредиенты страницы -
+    ещё двумя. Собирает обычные словари с теми же ключами, порядком
+    и значениями, что и RecipeSerializer. Совпадение ответов
+    проверяет команда check_fast_serializers.
+    """
+
+    def __init__(self, request, fields=None):
+        self.request = request
+        self.fields = [
+            name
+            for name in RecipeSerializer.Meta.fields
+            if fields is None or name in fields
+        ]
+        self.authenticated = request.user.is_authenticated
+
+    def get_values(self):
+        """Поля для values() набора рецептов."""
+        values = ["id"]
+        for name in ("name", "text", "cooking_time"):
+            if name in self.fields:
+                values.append(name)
+        if "image" in self.fields or "image_variants" in self.fields:
+            values.extend(["image", "image_variants"])
+        if "author" in self.fields:
+            values.extend(["author_id", *AUTHOR_VALUES])
+            if self.authenticated:
+                values.append("author_is_subscribed")
+        if self.authenticated:
+            for name in ("is_favorited", "is_in_shopping_cart"):
+                if name in self.fields:
+                    values.append(name)
+        return values
+
+    def get_rows(self, queryset):
+        return queryset.prefetch_related(None).values(*self.get_values())
+
+    def get_tags(self, ids):
+        tags = defaultdict(list)
+        rows = (
+            Recipe.tags.through.objects.filter(recipe_id__in=ids)
+            .order_by("tag__name")
+            .values_list(
+                "recipe_id", "tag_id", "tag__name", "tag__color", "tag__slug"
+            )
+        )
+        for recipe_id, pk, name, color, slug in rows:
+            tags[recipe_id].append(
+                {"id": pk, "name": name, "color": color, "slug": slug}
+            )
+        return tags
+
+    def get_ingredients(self, ids):
+        ingredients = defaultdict(list)
+        rows = RecipeIngredient.objects.filter(recipe_id__in=ids).values_list(
+            "recipe_id",
+            "ingredient_id",
+            "ingredient__name",
+            "ingredient__measurement_unit",
+            "amount",
+        )
+        for recipe_id, pk, name, measurement_unit, amount in rows:
+            ingredients[recipe_id].append(
+                {
+                    "id": pk,
+                    "name": name,
+                    "measurement_unit": measurement_unit,
+                    "amount": int(amount),
+                }
+            )
+        return ingredients
+
+    def build_url(self, path):
+        return self.request.build_absolute_uri(default_storage.url(path))
+
+    def get_image_variants(self, row):
+        if not row["image"]:
+            return {}
+        variants = row["image_variants"] or {}
+        return {
+            name: self.build_url(variants.get(name) or row["image"])
+            for name in IMAGE_VARIANTS
+        }
+
+    def get_author(self, row):
+        return {
+            "email": row["author__email"],
+            "id": row["author_id"],
+            "username": row["author__username"],
+            "first_name": row["author__first_name"],
+            "last_name": row["author__last_name"],
+            "is_subscribed": (
+                self.authenticated and row["author_is_subscribed"]
+            ),
+        }
+
+    def to_representation(self, row, tags, ingredients):
+        data = {}
+        for name in self.fields:
+            if name in ("id", "name", "text", "cooking_time"):
+                data[name] = row[name]
+            elif name == "tags":
+                data[name] = tags.get(row["id"], [])
+            elif name == "author":
+                data[name] = self.get_author(row)
+            elif name == "ingredients":
+                data[name] = ingredients.get(row["id"], [])
+            elif name in ("is_favorited", "is_in_shopping_cart"):
+                data[name] = self.authenticated and row[name]
+            elif name == "image":
+                data[name] = (
+                    self.build_url(row["image"]) if row["image"] else None
+                )
+            elif name == "image_variants":
+                data[name] = self.get_image_variants(row)
+        return data
+
+    def serialize(self, rows):
+        ids = [row["id"] for row in rows]
+        tags = self.get_tags(ids) if "tags" in self.fields else {}
+        ingredients = (
+            self.get_ingredients(ids) if "ingredients" in self.fields else {}
+        )
+        return [self.to_representation(row, tags, ingredients) for row in rows]
+
+
+class FastRecipeListMixin:
+    """
+    Список рецептов через RecipeRowSerializer вместо RecipeSerializer.
+    Используется при постраничном выводе по номеру страницы,
+    для курсора и ленты остаётся обычный путь.
+    """
+
+    fast_list = True
+
+    def list(self, request, *args, **kwargs):
+        if not self.fast_list or not isinstance(
+            self.paginator, PageLimitPagination
+        ):
+            return super().list(request, *args, **kwargs)
+        serializer = RecipeRowSerializer(request, self.get_requested_fields())
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(serializer.get_rows(queryset))
+        return self.get_paginated_response(serializer.serialize(page))
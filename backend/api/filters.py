@@ -1,10 +1,28 @@
-import re
-
 import django_filters
 
-from django.http import HttpRequest
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
+
+from recipe.models import Recipe, Tag
+from recipe.search import search_recipes
+
+from .versions import TAGS_VERSION, get_version
+
 
-from recipe.models import Recipe
+TAG_SLUG_MAP_TIMEOUT = 300
+
+
+def get_tag_slug_map():
+    """
+    Словарь {slug: id} всех тэгов. Кэшируется до изменения тэгов,
+    но не дольше TAG_SLUG_MAP_TIMEOUT секунд: в кэше процесса версия
+    не видит изменений, сделанных другими процессами.
+    """
+    return cache.get_or_set(
+        f"tag_slug_map:{get_version(TAGS_VERSION)}",
+        lambda: dict(Tag.objects.values_list("slug", "id")),
+        timeout=TAG_SLUG_MAP_TIMEOUT,
+    )
 
 
 class RecipeFilter(django_filters.FilterSet):
@@ -13,6 +31,7 @@ class RecipeFilter(django_filters.FilterSet):
         method="filter_is_in_shopping_cart"
     )
     tags = django_filters.CharFilter(method="filter_is_tags")
+    search = django_filters.CharFilter(method="filter_search")
 
     class Meta:
         model = Recipe
@@ -41,9 +60,21 @@ class RecipeFilter(django_filters.FilterSet):
         return queryset
 
     def filter_is_tags(self, queryset, name, value):
-        url = HttpRequest.get_full_path(self.request)
-        matches = re.findall(r"tags=([^&]+)", url)
-        tags = [match for match in matches]
-        if not tags:
+        slug_map = get_tag_slug_map()
+        tag_ids = {
+            slug_map[slug]
+            for slug in self.request.query_params.getlist(name)
+            if slug in slug_map
+        }
+        if not tag_ids:
             return queryset.none()
-        return queryset.filter(tags__slug__in=tags).distinct()
+        return queryset.filter(
+            Exists(
+                Recipe.tags.through.objects.filter(
+                    recipe=OuterRef("pk"), tag_id__in=tag_ids
+                )
+            )
+        )
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
@@ -0,0 +1,258 @@
+import re
+from urllib.parse import urlencode
+
+from rest_framework.test import APIClient
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from recipe.models import Favorite, Recipe, ShoppingCart, Tag
+from users.models import Subscription, User
+
+
+DUMMY_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+}
+READ_STATEMENTS = ("SELECT", "WITH")
+IDENTIFIER = re.compile(r"[a-z_][a-z0-9_]*")
+
+
+def walk(plan):
+    """Узел плана и все вложенные узлы."""
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from walk(child)
+
+
+class Command(BaseCommand):
+    """
+    Менеджмент-команда для поиска недостающих индексов. Выполняет
+    GET-запросы к API от анонима и пользователя, собирает запросы
+    ORM каждого ответа и запросы проверки связей при добавлении
+    в избранное, список покупок и подписки, и выполняет каждый
+    с EXPLAIN (ANALYZE, BUFFERS). В отчёте - время, прочитанные
+    буферы и последовательные чтения таблиц, в которых просмотрено
+    не меньше --min-rows строк. Работает только с PostgreSQL, данные
+    для проверки готовит seed_benchmark.
+    Пример использования в командной строке:
+    python manage.py advise_indexes --min-rows 500 --only recipes
+    """
+
+    help = "Ищет последовательные чтения в планах запросов API."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, default=None)
+        parser.add_argument("--min-rows", type=int, default=1000)
+        parser.add_argument("--only", default="")
+
+    def get_user(self, pk):
+        users = User.objects.annotate(
+            relations=Count("favorites") + Count("shopping_cart")
+        ).order_by("-relations", "id")
+        if pk is not None:
+            users = users.filter(pk=pk)
+        user = users.first()
+        if user is None:
+            raise CommandError("Пользователь для проверки не найден.")
+        return user
+
+    def get_endpoints(self, user):
+        recipe = Recipe.objects.order_by("-pub_date", "-id").first()
+        if recipe is None:
+            raise CommandError(
+                "Рецептов нет, сначала выполните seed_benchmark."
+            )
+        author = (
+            Subscription.objects.filter(user=user)
+            .values_list("author_id", flat=True)
+            .first()
+            or recipe.author_id
+        )
+        tags = urlencode(
+            {"tags": list(Tag.objects.values_list("slug", flat=True)[:2])},
+            doseq=True,
+        )
+        common = [
+            "/api/recipes/",
+            f"/api/recipes/?{tags}",
+            f"/api/recipes/?author={author}",
+            f"/api/recipes/?{urlencode({'search': 'рецепт'})}",
+            f"/api/recipes/{recipe.id}/",
+            "/api/tags/",
+            f"/api/ingredients/?{urlencode({'name': 'со'})}",
+            "/api/users/",
+        ]
+        personal = [
+            "/api/recipes/?is_favorited=1",
+            "/api/recipes/?is_in_shopping_cart=1",
+            "/api/recipes/feed/",
+            "/api/users/subscriptions/?recipes_limit=3",
+            "/api/users/me/",
+            "/api/recipes/download_shopping_cart/?format=json",
+        ]
+        return [(url, False) for url in common] + [
+            (url, True) for url in [*common, *personal]
+        ]
+
+    def get_querysets(self, user):
+        """Запросы, которые выполняются перед записью связей."""
+        recipe = Recipe.objects.exclude(author=user).first()
+        if recipe is None:
+            return []
+        return [
+            (
+                "ShoppingCart(user, recipe)",
+                ShoppingCart.objects.filter(user=user, recipe=recipe),
+            ),
+            (
+                "ShoppingCart(recipe)",
+                ShoppingCart.objects.filter(recipe=recipe).values_list(
+                    "user_id", flat=True
+                ),
+            ),
+            (
+                "Favorite(user, recipe)",
+                Favorite.objects.filter(user=user, recipe=recipe),
+            ),
+            (
+                "Subscription(user, author)",
+                Subscription.objects.filter(user=user, author=recipe.author),
+            ),
+            (
+                "Subscription(author)",
+                Subscription.objects.filter(author=recipe.author).values_list(
+                    "user_id", flat=True
+                ),
+            ),
+        ]
+
+    def capture(self, client, url):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, HTTP_HOST=self.host)
+            if response.streaming:
+                b"".join(response.streaming_content)
+        queries = [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].lstrip().upper().startswith(READ_STATEMENTS)
+        ]
+        return response.status_code, queries
+
+    def explain(self, sql, params=None):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params
+            )
+            (plan,) = cursor.fetchone()
+        return plan[0]
+
+    def get_leading_columns(self, table):
+        """Первые столбцы индексов таблицы."""
+        if table not in self.leading_columns:
+            with connection.cursor() as cursor:
+                constraints = connection.introspection.get_constraints(
+                    cursor, table
+                )
+            self.leading_columns[table] = {
+                constraint["columns"][0]
+                for constraint in constraints.values()
+                if constraint["columns"]
+                and (
+                    constraint["index"]
+                    or constraint["unique"]
+                    or constraint["primary_key"]
+                )
+            }
+        return self.leading_columns[table]
+
+    def get_warnings(self, plan):
+        warnings = []
+        for node in walk(plan["Plan"]):
+            if node["Node Type"] != "Seq Scan":
+                continue
+            rows = (
+                node["Actual Rows"] + node.get("Rows Removed by Filter", 0)
+            ) * node["Actual Loops"]
+            if rows < self.min_rows:
+                continue
+            table = node["Relation Name"]
+            condition = node.get("Filter")
+            if condition is None:
+                advice = "чтение всей таблицы"
+            elif self.get_leading_columns(table) & set(
+                IDENTIFIER.findall(condition)
+            ):
+                advice = (
+                    f"индекс для условия {condition} есть, но не выбран: "
+                    "строк мало или статистика устарела (ANALYZE)"
+                )
+            else:
+                advice = f"нет индекса для условия {condition}"
+            warnings.append(
+                f"Seq Scan {table}: просмотрено {rows} строк, {advice}"
+            )
+        return warnings
+
+    def report(self, label, plans):
+        time = sum(plan["Execution Time"] for plan in plans)
+        hit = sum(plan["Plan"].get("Shared Hit Blocks", 0) for plan in plans)
+        read = sum(plan["Plan"].get("Shared Read Blocks", 0) for plan in plans)
+        self.stdout.write(
+            f"{label}: запросов {len(plans)}, {time:.2f} мс, "
+            f"буферы hit={hit} read={read}"
+        )
+        warnings = [
+            warning for plan in plans for warning in self.get_warnings(plan)
+        ]
+        for warning in warnings:
+            self.stdout.write(self.style.WARNING(f"    {warning}"))
+        return len(warnings)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError(
+                "EXPLAIN (ANALYZE, BUFFERS) есть только в PostgreSQL."
+            )
+        self.min_rows = options["min_rows"]
+        self.leading_columns = {}
+        self.host = next(
+            (host for host in settings.ALLOWED_HOSTS if "*" not in host),
+            "localhost",
+        ).lstrip(".")
+        user = self.get_user(options["user"])
+        anonymous, personal = APIClient(), APIClient()
+        personal.force_authenticate(user)
+        found = 0
+        # Ответы не берутся из кэша, а всё, что запросы могли изменить,
+        # откатывается.
+        with override_settings(CACHES=DUMMY_CACHES), transaction.atomic():
+            for url, authenticated in self.get_endpoints(user):
+                if options["only"] not in url:
+                    continue
+                client = personal if authenticated else anonymous
+                status, queries = self.capture(client, url)
+                found += self.report(
+                    f"GET {url} ({user if authenticated else 'anonymous'}) "
+                    f"{status}",
+                    [self.explain(sql) for sql in queries],
+                )
+            for label, queryset in self.get_querysets(user):
+                if options["only"] not in label:
+                    continue
+                found += self.report(
+                    label,
+                    [self.explain(*queryset.query.sql_with_params())],
+                )
+            transaction.set_rollback(True)
+
+        if found:
+            self.stdout.write(
+                self.style.WARNING(f"Последовательных чтений: {found}.")
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS("Последовательных чтений не найдено.")
+            )
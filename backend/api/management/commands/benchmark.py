@@ -0,0 +1,674 @@
+import base64
+import json
+import math
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from io import BytesIO
+
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+
+from recipe.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from users.models import Subscription, User
+
+from .seed_benchmark import BENCHMARK_PASSWORD, BENCHMARK_USERNAME
+
+
+PERCENTILES = (50, 95, 99)
+REQUEST_TIMEOUT = 60
+BATCH_SIZE = 7
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга, values отсортированы."""
+    if not values:
+        return None
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def make_image():
+    buffer = BytesIO()
+    Image.new("RGB", (64, 64), "green").save(buffer, "PNG")
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f"data:image/png;base64,{encoded}"
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class Recorder:
+    """Время ответов и ошибки по каждому эндпоинту."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.durations = defaultdict(float)
+
+    def add(self, endpoint, elapsed, ok):
+        with self.lock:
+            self.latencies[endpoint].append(elapsed)
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def report(self):
+        endpoints = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            latencies.sort()
+            duration = self.durations[endpoint]
+            endpoints[endpoint] = {
+                "requests": len(latencies),
+                "errors": self.errors[endpoint],
+                "throughput_rps": (
+                    round(len(latencies) / duration, 2) if duration else None
+                ),
+                **{
+                    f"p{percent}_ms": round(
+                        percentile(latencies, percent) * 1000, 2
+                    )
+                    for percent in PERCENTILES
+                },
+            }
+        return endpoints
+
+
+class Client:
+    """HTTP-клиент, который записывает время ответа в Recorder."""
+
+    def __init__(self, base_url, recorder, token=None):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.token = token
+
+    def request(self, endpoint, method, path, data=None, expected=(200,)):
+        headers = {"Accept": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Token {self.token}"
+        body = None
+        if data is not None:
+            body = json.dumps(data).encode()
+            headers["Content-Type"] = "application/json"
+        request = urllib.request.Request(
+            self.base_url + path, data=body, headers=headers, method=method
+        )
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(
+                request, timeout=REQUEST_TIMEOUT
+            ) as response:
+                content = response.read()
+                status = response.status
+        except urllib.error.HTTPError as error:
+            content = error.read()
+            status = error.code
+        except OSError:
+            content, status = b"", None
+        self.recorder.add(
+            endpoint, time.perf_counter() - started, status in expected
+        )
+        if status is None or not content:
+            return None
+        try:
+            return json.loads(content)
+        except ValueError:
+            return None
+
+
+class Command(BaseCommand):
+    """
+    Менеджмент-команда для нагрузочного тестирования API.
+    Каждый эндпоинт из api/urls.py вызывается --requests раз
+    в --concurrency потоков от имени анонимных и авторизованных
+    пользователей, созданных командой seed_benchmark.
+    Пример использования в командной строке:
+    python manage.py seed_benchmark
+    python manage.py benchmark --requests 200 --concurrency 8 --output a.json
+    Без --base-url приложение запускается во встроенном WSGI-сервере
+    в том же процессе. База - PostgreSQL из настроек или SQLite:
+    DB_ENGINE=sqlite3 DB_NAME=bench.sqlite3 python manage.py benchmark.
+    На SQLite параллельные запросы на запись могут завершаться
+    ошибкой database is locked, они учитываются в errors.
+    Для сравнения между коммитами запускайте команду на одной и той же
+    базе с одинаковыми параметрами и --seed.
+    """
+
+    help = (
+        "Нагрузочный тест API на данных seed_benchmark. База - PostgreSQL "
+        "или SQLite (DB_ENGINE=sqlite3, файл в DB_NAME)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default=None)
+        parser.add_argument("--requests", type=int, default=100)
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--only",
+            default=None,
+            help="Запустить только эндпоинты, содержащие эту строку.",
+        )
+        parser.add_argument("--output", default=None)
+
+    def handle(self, *args, **kwargs):
+        self.rnd = random.Random(kwargs["seed"])
+        self.load_dataset()
+        server = None
+        base_url = kwargs["base_url"]
+        if base_url is None:
+            server = ThreadedWSGIServer(("127.0.0.1", 0), QuietRequestHandler)
+            server.set_app(get_wsgi_application())
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base_url = f"http://127.0.0.1:{server.server_port}"
+        self.base_url = base_url.rstrip("/") + "/api"
+        self.recorder = Recorder()
+        self.image = make_image()
+
+        only = kwargs["only"]
+        try:
+            for endpoint, scenario in self.get_scenarios():
+                if only and only not in endpoint:
+                    continue
+                self.run_scenario(
+                    endpoint,
+                    scenario,
+                    kwargs["requests"],
+                    kwargs["concurrency"],
+                )
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+
+        result = json.dumps(
+            {
+                "meta": {
+                    "started_at": datetime.now(timezone.utc).isoformat(),
+                    "database": connection.vendor,
+                    "base_url": self.base_url,
+                    "requests": kwargs["requests"],
+                    "concurrency": kwargs["concurrency"],
+                    "seed": kwargs["seed"],
+                    "users": len(self.users),
+                    "recipes": len(self.recipes),
+                },
+                "endpoints": self.recorder.report(),
+            },
+            ensure_ascii=False,
+            indent=2,
+        )
+        if kwargs["output"]:
+            with open(kwargs["output"], "w", encoding="utf-8") as file:
+                file.write(result)
+        else:
+            self.stdout.write(result)
+
+    def load_dataset(self):
+        tokens = dict(
+            Token.objects.filter(
+                user__username__startswith=BENCHMARK_USERNAME
+            ).values_list("user_id", "key")
+        )
+        if not tokens:
+            raise CommandError(
+                "Нет пользователей для теста, выполните seed_benchmark."
+            )
+        self.users = sorted(tokens)
+        self.tokens = tokens
+        self.emails = dict(
+            User.objects.filter(id__in=self.users).values_list("id", "email")
+        )
+        self.recipes = list(
+            Recipe.objects.order_by("id").values_list("id", flat=True)
+        )
+        self.recipe_pages = min(max(len(self.recipes) // 6, 1), 10)
+        self.tags = list(Tag.objects.values_list("id", "slug"))
+        self.ingredients = list(
+            Ingredient.objects.order_by("id").values_list("id", "name")
+        )
+        self.favorites = set(Favorite.objects.values_list("user", "recipe"))
+        self.cart = set(ShoppingCart.objects.values_list("user", "recipe"))
+        self.subscriptions = set(
+            Subscription.objects.values_list("user", "author")
+        )
+        self.admin = (
+            User.objects.filter(id__in=self.users, is_staff=True)
+            .values_list("id", flat=True)
+            .first()
+        )
+
+    def run_scenario(self, endpoint, scenario, requests, concurrency):
+        """
+        Запускает сценарий requests раз. Номер итерации определяет
+        пользователя и объекты запроса, поэтому параллельные итерации
+        не мешают друг другу, а повторный запуск даёт те же запросы.
+        """
+        seeds = [self.rnd.random() for _ in range(requests)]
+        before = set(self.recorder.latencies)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(scenario, range(requests), seeds))
+        duration = time.perf_counter() - started
+        for name in set(self.recorder.latencies) - before:
+            self.recorder.durations[name] += duration
+        self.stderr.write(f"{endpoint}: {requests} итераций")
+
+    def client(self, user=None):
+        token = self.tokens[user] if user is not None else None
+        return Client(self.base_url, self.recorder, token)
+
+    def user_for(self, number):
+        return self.users[number % len(self.users)]
+
+    def free_object(self, user, number, objects, taken):
+        """
+        Объект, ещё не связанный с пользователем. Разные итерации одного
+        пользователя получают разные объекты.
+        """
+        free = [item for item in objects if (user, item) not in taken]
+        if not free:
+            return None
+        return free[(number // len(self.users)) % len(free)]
+
+    def recipe_data(self, rnd):
+        return {
+            "ingredients": [
+                {"id": ingredient, "amount": rnd.randint(1, 500)}
+                for ingredient, _ in rnd.sample(
+                    self.ingredients, rnd.randint(5, 30)
+                )
+            ],
+            "tags": [tag for tag, _ in rnd.sample(self.tags, 1)],
+            "image": self.image,
+            "name": "Рецепт нагрузочного теста",
+            "text": "Описание рецепта нагрузочного теста.",
+            "cooking_time": rnd.randint(5, 120),
+        }
+
+    def get_scenarios(self):
+        """Пары (эндпоинт, сценарий). Сценарий принимает номер и seed."""
+
+        def recipes_list_anonymous(number, seed):
+            page = random.Random(seed).randint(1, self.recipe_pages)
+            self.client().request(
+                "GET /recipes/ (anonymous)",
+                "GET",
+                f"/recipes/?page={page}&limit=6",
+            )
+
+        def recipes_list(number, seed):
+            page = random.Random(seed).randint(1, self.recipe_pages)
+            self.client(self.user_for(number)).request(
+                "GET /recipes/", "GET", f"/recipes/?page={page}&limit=6"
+            )
+
+        def recipes_list_tags(number, seed):
+            rnd = random.Random(seed)
+            tags = "&".join(
+                f"tags={slug}" for _, slug in rnd.sample(self.tags, 2)
+            )
+            self.client(self.user_for(number)).request(
+                "GET /recipes/?tags=", "GET", f"/recipes/?limit=6&{tags}"
+            )
+
+        def recipes_list_author(number, seed):
+            author = random.Random(seed).choice(self.users)
+            self.client().request(
+                "GET /recipes/?author=",
+                "GET",
+                f"/recipes/?limit=6&author={author}",
+            )
+
+        def recipes_list_search(number, seed):
+            recipe = random.Random(seed).choice(self.recipes)
+            self.client().request(
+                "GET /recipes/?search=",
+                "GET",
+                "/recipes/?"
+                + urllib.parse.urlencode(
+                    {"limit": 6, "search": f"рецепт {recipe}"}
+                ),
+            )
+
+        def recipes_list_favorited(number, seed):
+            self.client(self.user_for(number)).request(
+                "GET /recipes/?is_favorited=1",
+                "GET",
+                "/recipes/?limit=6&is_favorited=1",
+            )
+
+        def recipes_list_cart(number, seed):
+            self.client(self.user_for(number)).request(
+                "GET /recipes/?is_in_shopping_cart=1",
+                "GET",
+                "/recipes/?limit=6&is_in_shopping_cart=1",
+            )
+
+        def recipes_list_cursor(number, seed):
+            client = self.client(self.user_for(number))
+            url = "/recipes/?cursor=&limit=6"
+            for _ in range(3):
+                page = client.request("GET /recipes/?cursor=", "GET", url)
+                if not page or not page.get("next"):
+                    break
+                url = page["next"].split("/api", 1)[1]
+
+        def feed(number, seed):
+            client = self.client(self.user_for(number))
+            url = "/recipes/feed/?limit=6"
+            for _ in range(3):
+                page = client.request("GET /recipes/feed/", "GET", url)
+                if not page or not page.get("next"):
+                    break
+                url = page["next"].split("/api", 1)[1]
+
+        def recipe_detail_anonymous(number, seed):
+            recipe = random.Random(seed).choice(self.recipes)
+            self.client().request(
+                "GET /recipes/{id}/ (anonymous)", "GET", f"/recipes/{recipe}/"
+            )
+
+        def recipe_detail(number, seed):
+            recipe = random.Random(seed).choice(self.recipes)
+            self.client(self.user_for(number)).request(
+                "GET /recipes/{id}/", "GET", f"/recipes/{recipe}/"
+            )
+
+        def recipe_create_update_delete(number, seed):
+            rnd = random.Random(seed)
+            client = self.client(self.user_for(number))
+            recipe = client.request(
+                "POST /recipes/",
+                "POST",
+                "/recipes/",
+                self.recipe_data(rnd),
+                expected=(201,),
+            )
+            if not recipe:
+                return
+            client.request(
+                "PATCH /recipes/{id}/",
+                "PATCH",
+                f"/recipes/{recipe['id']}/",
+                self.recipe_data(rnd),
+            )
+            client.request(
+                "DELETE /recipes/{id}/",
+                "DELETE",
+                f"/recipes/{recipe['id']}/",
+                expected=(204,),
+            )
+
+        def relation(endpoint, path, objects, taken):
+            def scenario(number, seed):
+                user = self.user_for(number)
+                item = self.free_object(user, number, objects, taken)
+                if item is None:
+                    return
+                client = self.client(user)
+                client.request(
+                    f"POST {endpoint}",
+                    "POST",
+                    path.format(id=item),
+                    expected=(201,),
+                )
+                client.request(
+                    f"DELETE {endpoint}",
+                    "DELETE",
+                    path.format(id=item),
+                    expected=(204,),
+                )
+
+            return scenario
+
+        def batch(endpoint, path, objects, taken):
+            def scenario(number, seed):
+                user = self.user_for(number)
+                free = [item for item in objects if (user, item) not in taken]
+                ids = random.Random(seed).sample(
+                    free, min(BATCH_SIZE, len(free))
+                )
+                if not ids:
+                    return
+                client = self.client(user)
+                client.request(f"POST {endpoint}", "POST", path, {"ids": ids})
+                client.request(
+                    f"DELETE {endpoint}", "DELETE", path, {"ids": ids}
+                )
+
+            return scenario
+
+        def download_shopping_cart(number, seed):
+            self.client(self.user_for(number)).request(
+                "GET /recipes/download_shopping_cart/",
+                "GET",
+                "/recipes/download_shopping_cart/",
+            )
+
+        def export_shopping_cart(number, seed):
+            self.client(self.user_for(number)).request(
+                "GET /recipes/download_shopping_cart/?format=csv",
+                "GET",
+                "/recipes/download_shopping_cart/?format=csv",
+            )
+
+        def tags_list(number, seed):
+            self.client().request("GET /tags/", "GET", "/tags/")
+
+        def tag_detail(number, seed):
+            tag, _ = random.Random(seed).choice(self.tags)
+            self.client().request("GET /tags/{id}/", "GET", f"/tags/{tag}/")
+
+        def ingredients_list(number, seed):
+            self.client().request("GET /ingredients/", "GET", "/ingredients/")
+
+        def ingredients_search(number, seed):
+            _, name = random.Random(seed).choice(self.ingredients)
+            prefix = urllib.request.quote(name[:3])
+            self.client().request(
+                "GET /ingredients/?name=",
+                "GET",
+                f"/ingredients/?name={prefix}",
+            )
+
+        def ingredient_detail(number, seed):
+            ingredient, _ = random.Random(seed).choice(self.ingredients)
+            self.client().request(
+                "GET /ingredients/{id}/",
+                "GET",
+                f"/ingredients/{ingredient}/",
+            )
+
+        def users_list(number, seed):
+            pages = max(len(self.users) // 6, 1)
+            page = random.Random(seed).randint(1, pages)
+            self.client(self.user_for(number)).request(
+                "GET /users/", "GET", f"/users/?page={page}&limit=6"
+            )
+
+        def users_list_anonymous(number, seed):
+            self.client().request(
+                "GET /users/ (anonymous)", "GET", "/users/?limit=6"
+            )
+
+        def user_detail(number, seed):
+            user = random.Random(seed).choice(self.users)
+            self.client(self.user_for(number)).request(
+                "GET /users/{id}/", "GET", f"/users/{user}/"
+            )
+
+        def users_me(number, seed):
+            self.client(self.user_for(number)).request(
+                "GET /users/me/", "GET", "/users/me/"
+            )
+
+        def users_create(number, seed):
+            suffix = f"{int(seed * 10**12)}-{number}"
+            self.client().request(
+                "POST /users/",
+                "POST",
+                "/users/",
+                {
+                    "email": f"new-{suffix}@example.com",
+                    "username": f"new-{suffix}",
+                    "first_name": "Новый",
+                    "last_name": "Пользователь",
+                    "password": BENCHMARK_PASSWORD,
+                },
+                expected=(201,),
+            )
+
+        def set_password(number, seed):
+            self.client(self.user_for(number)).request(
+                "POST /users/set_password/",
+                "POST",
+                "/users/set_password/",
+                {
+                    "current_password": BENCHMARK_PASSWORD,
+                    "new_password": BENCHMARK_PASSWORD,
+                },
+                expected=(204,),
+            )
+
+        def subscriptions(number, seed):
+            self.client(self.user_for(number)).request(
+                "GET /users/subscriptions/",
+                "GET",
+                "/users/subscriptions/?limit=6&recipes_limit=3",
+            )
+
+        def token_login_logout(number, seed):
+            user = self.user_for(number)
+            token = self.client().request(
+                "POST /auth/token/login/",
+                "POST",
+                "/auth/token/login/",
+                {"email": self.emails[user], "password": BENCHMARK_PASSWORD},
+            )
+            if not token:
+                return
+            # Выход удаляет общий токен пользователя, поэтому
+            # после выхода токен восстанавливается повторным входом.
+            self.client(user).request(
+                "POST /auth/token/logout/",
+                "POST",
+                "/auth/token/logout/",
+                expected=(204,),
+            )
+            token = self.client().request(
+                "POST /auth/token/login/",
+                "POST",
+                "/auth/token/login/",
+                {"email": self.emails[user], "password": BENCHMARK_PASSWORD},
+            )
+            if token:
+                self.tokens[user] = token["auth_token"]
+
+        def metrics(number, seed):
+            self.client(self.admin).request(
+                "GET /metrics/", "GET", "/metrics/"
+            )
+
+        scenarios = [
+            ("GET /recipes/ (anonymous)", recipes_list_anonymous),
+            ("GET /recipes/", recipes_list),
+            ("GET /recipes/?tags=", recipes_list_tags),
+            ("GET /recipes/?author=", recipes_list_author),
+            ("GET /recipes/?search=", recipes_list_search),
+            ("GET /recipes/?is_favorited=1", recipes_list_favorited),
+            ("GET /recipes/?is_in_shopping_cart=1", recipes_list_cart),
+            ("GET /recipes/?cursor=", recipes_list_cursor),
+            ("GET /recipes/feed/", feed),
+            ("GET /recipes/{id}/ (anonymous)", recipe_detail_anonymous),
+            ("GET /recipes/{id}/", recipe_detail),
+            ("POST|PATCH|DELETE /recipes/", recipe_create_update_delete),
+            (
+                "POST|DELETE /recipes/{id}/favorite/",
+                relation(
+                    "/recipes/{id}/favorite/",
+                    "/recipes/{id}/favorite/",
+                    self.recipes,
+                    self.favorites,
+                ),
+            ),
+            (
+                "POST|DELETE /recipes/{id}/shopping_cart/",
+                relation(
+                    "/recipes/{id}/shopping_cart/",
+                    "/recipes/{id}/shopping_cart/",
+                    self.recipes,
+                    self.cart,
+                ),
+            ),
+            (
+                "POST|DELETE /users/{id}/subscribe/",
+                relation(
+                    "/users/{id}/subscribe/",
+                    "/users/{id}/subscribe/",
+                    self.users,
+                    self.subscriptions | {(user, user) for user in self.users},
+                ),
+            ),
+            (
+                "POST|DELETE /recipes/favorite/",
+                batch(
+                    "/recipes/favorite/",
+                    "/recipes/favorite/",
+                    self.recipes,
+                    self.favorites,
+                ),
+            ),
+            (
+                "POST|DELETE /recipes/shopping_cart/",
+                batch(
+                    "/recipes/shopping_cart/",
+                    "/recipes/shopping_cart/",
+                    self.recipes,
+                    self.cart,
+                ),
+            ),
+            (
+                "POST|DELETE /users/subscribe/",
+                batch(
+                    "/users/subscribe/",
+                    "/users/subscribe/",
+                    self.users,
+                    self.subscriptions | {(user, user) for user in self.users},
+                ),
+            ),
+            ("GET /recipes/download_shopping_cart/", download_shopping_cart),
+            (
+                "GET /recipes/download_shopping_cart/?format=csv",
+                export_shopping_cart,
+            ),
+            ("GET /users/subscriptions/", subscriptions),
+            ("GET /tags/", tags_list),
+            ("GET /tags/{id}/", tag_detail),
+            ("GET /ingredients/", ingredients_list),
+            ("GET /ingredients/?name=", ingredients_search),
+            ("GET /ingredients/{id}/", ingredient_detail),
+            ("GET /users/ (anonymous)", users_list_anonymous),
+            ("GET /users/", users_list),
+            ("GET /users/{id}/", user_detail),
+            ("GET /users/me/", users_me),
+            ("POST /users/", users_create),
+            ("POST /users/set_password/", set_password),
+            ("POST /auth/token/login|logout/", token_login_logout),
+        ]
+        if self.admin is not None:
+            scenarios.append(("GET /metrics/", metrics))
+        return scenarios
@@ -0,0 +1,103 @@
+from urllib.parse import urlencode
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from api.renderers import FastJSONRenderer
+from api.views import RecipeViewSet
+from recipe.models import Recipe, Tag
+from users.models import User
+
+
+def get_view(fast):
+    """Список рецептов без кэша, быстрым или обычным путём."""
+
+    class CheckRecipeViewSet(RecipeViewSet):
+        fast_list = fast
+        renderer_classes = (FastJSONRenderer if fast else JSONRenderer,)
+
+        def get_cached_response(self, handler, request, *args, **kwargs):
+            return handler(request, *args, **kwargs)
+
+    return CheckRecipeViewSet.as_view({"get": "list"})
+
+
+class Command(BaseCommand):
+    """
+    Менеджмент-команда для проверки быстрого пути списка рецептов:
+    ответы RecipeRowSerializer с FastJSONRenderer сравниваются
+    побайтно с ответами RecipeSerializer с JSONRenderer для анонима
+    и нескольких пользователей на наборе запросов.
+    Пример использования в командной строке:
+    python manage.py check_fast_serializers --users 5
+    """
+
+    help = "Сравнивает быстрый и обычный вывод списка рецептов."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=5)
+
+    def get_queries(self):
+        params = [
+            {},
+            {"limit": 50},
+            {"page": 2},
+            {"is_favorited": 1},
+            {"is_in_shopping_cart": 1},
+            {"fields": "id,name,author"},
+            {"fields": "image,image_variants,tags,is_favorited"},
+            {"search": "рецепт"},
+        ]
+        slugs = list(Tag.objects.values_list("slug", flat=True)[:2])
+        if slugs:
+            params.append({"tags": slugs})
+        author = Recipe.objects.values_list("author_id", flat=True).first()
+        if author is not None:
+            params.append({"author": author})
+        return [urlencode(query, doseq=True) for query in params]
+
+    def get_users(self, count):
+        users = list(
+            User.objects.annotate(
+                relations=Count("favorites") + Count("shopping_cart")
+            ).order_by("-relations", "id")[:count]
+        )
+        return [AnonymousUser(), *users]
+
+    def render(self, view, user, query):
+        request = APIRequestFactory().get(f"/api/recipes/?{query}")
+        if user.is_authenticated:
+            force_authenticate(request, user=user)
+        response = view(request)
+        response.render()
+        return response.status_code, response.content
+
+    def handle(self, *args, **options):
+        fast_view, view = get_view(True), get_view(False)
+        checked = 0
+        mismatches = []
+        for user in self.get_users(options["users"]):
+            for query in self.get_queries():
+                expected = self.render(view, user, query)
+                actual = self.render(fast_view, user, query)
+                checked += 1
+                if actual != expected:
+                    mismatches.append((user, query, expected, actual))
+
+        for user, query, expected, actual in mismatches:
+            self.stderr.write(
+                f"{user or 'anonymous'} ?{query}: "
+                f"ожидалось {expected[0]} {expected[1][:300]!r}, "
+                f"получено {actual[0]} {actual[1][:300]!r}"
+            )
+        if mismatches:
+            raise CommandError(
+                f"Ответы не совпали: {len(mismatches)} из {checked}."
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"Ответы совпали: {checked} из {checked}.")
+        )
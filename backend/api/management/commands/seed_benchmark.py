@@ -0,0 +1,203 @@
+import random
+from io import BytesIO
+
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from recipe.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+)
+from users.models import Subscription, User
+
+
+BATCH_SIZE = 1000
+BENCHMARK_USERNAME = "bench-"
+BENCHMARK_PASSWORD = "benchmark-password"
+BENCHMARK_IMAGE = "recipes/images/benchmark.png"
+MIN_INGREDIENTS = 5
+MAX_INGREDIENTS = 30
+
+
+def sample_pairs(rnd, left, right, per_left):
+    """Случайные уникальные пары (left, right), per_left на каждый left."""
+    pairs = set()
+    for item in left:
+        for other in rnd.sample(right, min(per_left, len(right))):
+            pairs.add((item, other))
+    return pairs
+
+
+class Command(BaseCommand):
+    """
+    Менеджмент-команда для наполнения базы синтетическими данными
+    для нагрузочного тестирования (команда benchmark).
+    Пример использования в командной строке:
+    python manage.py seed_benchmark --users 50 --recipes 500
+    Ингредиенты и тэги загружаются из data/, если их ещё нет в базе.
+    Пароль всех созданных пользователей - benchmark-password,
+    первый из них - администратор.
+    Без PostgreSQL команды seed_benchmark и benchmark работают
+    с SQLite: DB_ENGINE=sqlite3 DB_NAME=bench.sqlite3.
+    """
+
+    help = (
+        "Наполняет базу данными для benchmark. База - PostgreSQL "
+        "или SQLite (DB_ENGINE=sqlite3, файл в DB_NAME)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--recipes", type=int, default=500)
+        parser.add_argument("--favorites", type=int, default=10)
+        parser.add_argument("--cart", type=int, default=5)
+        parser.add_argument("--subscriptions", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **kwargs):
+        rnd = random.Random(kwargs["seed"])
+        data_dir = settings.BASE_DIR / "data"
+        if not Ingredient.objects.exists():
+            call_command(
+                "import_csv", "Ingredient", str(data_dir / "ingredients.csv")
+            )
+        if not Tag.objects.exists():
+            call_command("import_csv", "Tag", str(data_dir / "tags.csv"))
+
+        users = self.create_users(kwargs["users"])
+        recipes = self.create_recipes(rnd, users, kwargs["recipes"])
+
+        Favorite.objects.bulk_create(
+            (
+                Favorite(user_id=user, recipe_id=recipe)
+                for user, recipe in sample_pairs(
+                    rnd, users, recipes, kwargs["favorites"]
+                )
+            ),
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        ShoppingCart.objects.bulk_create(
+            (
+                ShoppingCart(user_id=user, recipe_id=recipe)
+                for user, recipe in sample_pairs(
+                    rnd, users, recipes, kwargs["cart"]
+                )
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        Subscription.objects.bulk_create(
+            (
+                Subscription(user_id=user, author_id=author)
+                for user, author in sample_pairs(
+                    rnd, users, users, kwargs["subscriptions"]
+                )
+                if user != author
+            ),
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+        call_command("update_counters", stdout=self.stdout)
+        call_command("rebuild_feed", stdout=self.stdout)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Создано пользователей: {len(users)}, "
+                f"рецептов: {len(recipes)}."
+            )
+        )
+
+    def create_users(self, count):
+        start = User.objects.aggregate(max_id=Max("id"))["max_id"] or 0
+        password = make_password(BENCHMARK_PASSWORD)
+        User.objects.bulk_create(
+            (
+                User(
+                    username=f"{BENCHMARK_USERNAME}{start + number}",
+                    email=f"{BENCHMARK_USERNAME}{start + number}@example.com",
+                    first_name="Бенчмарк",
+                    last_name=str(start + number),
+                    password=password,
+                )
+                for number in range(count)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        users = list(
+            User.objects.filter(id__gt=start)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        User.objects.filter(id=users[0]).update(is_staff=True)
+        Token.objects.bulk_create(
+            (Token(user_id=user, key=Token.generate_key()) for user in users),
+            batch_size=BATCH_SIZE,
+        )
+        return users
+
+    def create_recipes(self, rnd, users, count):
+        if not default_storage.exists(BENCHMARK_IMAGE):
+            buffer = BytesIO()
+            Image.new("RGB", (740, 480), "orange").save(buffer, "PNG")
+            default_storage.save(
+                BENCHMARK_IMAGE, ContentFile(buffer.getvalue())
+            )
+
+        start = Recipe.objects.aggregate(max_id=Max("id"))["max_id"] or 0
+        Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    author_id=rnd.choice(users),
+                    name=f"Рецепт {start + number}",
+                    text="Синтетический рецепт для нагрузочного теста. " * 5,
+                    image=BENCHMARK_IMAGE,
+                    cooking_time=rnd.randint(5, 120),
+                )
+                for number in range(count)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        recipes = list(
+            Recipe.objects.filter(id__gt=start)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+
+        ingredients = list(Ingredient.objects.values_list("id", flat=True))
+        tags = list(Tag.objects.values_list("id", flat=True))
+        RecipeIngredient.objects.bulk_create(
+            (
+                RecipeIngredient(
+                    recipe_id=recipe,
+                    ingredient_id=ingredient,
+                    amount=rnd.randint(1, 500),
+                )
+                for recipe in recipes
+                for ingredient in rnd.sample(
+                    ingredients,
+                    rnd.randint(MIN_INGREDIENTS, MAX_INGREDIENTS),
+                )
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        Recipe.tags.through.objects.bulk_create(
+            (
+                Recipe.tags.through(recipe_id=recipe, tag_id=tag)
+                for recipe in recipes
+                for tag in rnd.sample(tags, rnd.randint(1, min(3, len(tags))))
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        return recipes
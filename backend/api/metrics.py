@@ -0,0 +1,126 @@
+import asyncio
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from django.db import connection
+
+
+LABELS = ("route", "method")
+
+REQUESTS = Counter(
+    "foodgram_requests_total",
+    "Количество запросов.",
+    LABELS + ("status",),
+)
+REQUEST_LATENCY = Histogram(
+    "foodgram_request_latency_seconds",
+    "Время обработки запроса.",
+    LABELS,
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_QUERIES = Histogram(
+    "foodgram_request_sql_queries",
+    "Количество SQL-запросов на один запрос.",
+    LABELS,
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144),
+)
+REQUEST_SQL_TIME = Histogram(
+    "foodgram_request_sql_seconds",
+    "Суммарное время SQL-запросов на один запрос.",
+    LABELS,
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+RESPONSE_SIZE = Histogram(
+    "foodgram_response_size_bytes",
+    "Размер тела ответа.",
+    LABELS,
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+
+
+class QueryCounter:
+    """execute_wrapper, считающий количество и время SQL-запросов."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+def get_route(request):
+    resolver_match = getattr(request, "resolver_match", None)
+    if resolver_match is None:
+        return "unresolved"
+    return resolver_match.route or resolver_match.view_name
+
+
+class MetricsMiddleware:
+    """
+    Собирает по маршруту и методу время ответа, количество и время
+    SQL-запросов и размер ответа. В асинхронном режиме SQL-запросы
+    выполняются в других потоках и не учитываются.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        queries = QueryCounter()
+        start = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+        self.observe(request, response, time.perf_counter() - start, queries)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.observe(request, response, time.perf_counter() - start)
+        return response
+
+    def observe(self, request, response, duration, queries=None):
+        labels = (get_route(request), request.method)
+        REQUESTS.labels(*labels, response.status_code).inc()
+        REQUEST_LATENCY.labels(*labels).observe(duration)
+        if queries is not None:
+            REQUEST_QUERIES.labels(*labels).observe(queries.count)
+            REQUEST_SQL_TIME.labels(*labels).observe(queries.duration)
+        if not response.streaming:
+            RESPONSE_SIZE.labels(*labels).observe(len(response.content))
+
+
+def render_metrics():
+    """
+    Метрики в текстовом формате Prometheus. Если задан
+    PROMETHEUS_MULTIPROC_DIR, метрики собираются со всех процессов
+    gunicorn.
+    """
+    registry = REGISTRY
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -1,5 +1,101 @@
-from rest_framework.pagination import PageNumberPagination
+from collections import OrderedDict
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    Cursor,
+    CursorPagination,
+    PageNumberPagination,
+)
+from rest_framework.response import Response
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from recipe.feed import get_feed
 
 
 class PageLimitPagination(PageNumberPagination):
     page_size_query_param = "limit"
+
+
+class RecipeCursorPagination(CursorPagination):
+    """
+    Постраничный вывод рецептов по курсору без подсчёта COUNT(*).
+    Курсор хранит (pub_date, id) последнего рецепта страницы,
+    следующая страница выбирается условием по этой паре.
+    """
+
+    ordering = ("-pub_date", "-id")
+    page_size_query_param = "limit"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        self.has_previous = False
+
+        queryset = queryset.order_by(*self.ordering)
+        if self.cursor is not None and self.cursor.position is not None:
+            pub_date, pk = self.decode_position(self.cursor.position)
+            queryset = queryset.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk)
+            )
+
+        results = list(queryset[: self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        return self.page
+
+    def decode_position(self, position):
+        pub_date, _, pk = position.rpartition("|")
+        pub_date = parse_datetime(pub_date)
+        if pub_date is None or not pk.isdigit():
+            raise NotFound(self.invalid_cursor_message)
+        return pub_date, int(pk)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        return self.encode_cursor(
+            Cursor(
+                offset=0,
+                reverse=False,
+                position=f"{last.pub_date.isoformat()}|{last.pk}",
+            )
+        )
+
+    def get_previous_link(self):
+        return None
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict([("next", self.get_next_link()), ("results", data)])
+        )
+
+
+class FeedPagination(RecipeCursorPagination):
+    """
+    Постраничный вывод ленты подписок по курсору. Идентификаторы
+    рецептов страницы берутся из ленты пользователя, сами рецепты
+    загружаются из переданного queryset.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        self.has_previous = False
+
+        before = None
+        if self.cursor is not None and self.cursor.position is not None:
+            before = self.decode_position(self.cursor.position)
+        rows = get_feed(request.user, self.page_size + 1, before)
+        self.has_next = len(rows) > self.page_size
+        ids = [pk for _, pk in rows[: self.page_size]]
+        recipes = queryset.in_bulk(ids)
+        self.page = [recipes[pk] for pk in ids if pk in recipes]
+        return self.page
@@ -0,0 +1,138 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from pathlib import Path
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+FONT_NAME = "Verdana"
+FONT_PATH = Path(__file__).resolve().parent.parent / "fonts" / "Verdana.ttf"
+TITLE_SIZE = 20
+TEXT_SIZE = 12
+PAGE_NUMBER_SIZE = 9
+LINE_HEIGHT = 30
+MARGIN = 60
+FIRST_PAGE_TOP = 670
+
+font_lock = threading.Lock()
+executor_lock = threading.Lock()
+executor = None
+executor_pid = None
+
+
+def register_font():
+    """
+    Регистрирует шрифт один раз на процесс. В документ reportlab
+    встраивает только подмножество глифов, использованных в тексте.
+    """
+    if FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        return
+    with font_lock:
+        if FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(TTFont(FONT_NAME, FONT_PATH))
+
+
+def split_pages(lines):
+    """
+    Переносит строки по ширине страницы и делит их на страницы.
+    На первой странице место под заголовок.
+    """
+    width = A4[0] - 2 * MARGIN
+    rows = []
+    for line in lines:
+        rows.extend(simpleSplit(line, FONT_NAME, TEXT_SIZE, width) or [""])
+    first_page_size = (FIRST_PAGE_TOP - MARGIN) // LINE_HEIGHT + 1
+    page_size = int(A4[1] - 2 * MARGIN) // LINE_HEIGHT + 1
+    pages = [rows[:first_page_size]]
+    for start in range(first_page_size, len(rows), page_size):
+        end = start + page_size
+        pages.append(rows[start:end])
+    return pages
+
+
+def render_shopping_list(title, lines):
+    """
+    PDF со списком покупок: заголовок, строки lines и номера страниц.
+    Документ собирается в режиме invariant, без даты создания
+    и случайного идентификатора, поэтому одинаковые данные дают
+    одинаковые байты.
+    """
+    register_font()
+    buffer = BytesIO()
+    page = canvas.Canvas(buffer, pagesize=A4, invariant=True)
+    pages = split_pages(lines)
+    for number, rows in enumerate(pages, start=1):
+        if number == 1:
+            page.setFont(FONT_NAME, TITLE_SIZE)
+            page.drawString(MARGIN, 750, title)
+            page.line(MARGIN, 730, A4[0] - MARGIN, 730)
+            y = FIRST_PAGE_TOP
+        else:
+            y = A4[1] - MARGIN
+        page.setFont(FONT_NAME, TEXT_SIZE)
+        for row in rows:
+            page.drawString(MARGIN, y, row)
+            y -= LINE_HEIGHT
+        page.setFont(FONT_NAME, PAGE_NUMBER_SIZE)
+        page.drawRightString(
+            A4[0] - MARGIN, MARGIN / 2, f"{number} / {len(pages)}"
+        )
+        page.showPage()
+    page.save()
+    return buffer.getvalue()
+
+
+def get_executor():
+    """
+    Пул процессов для сборки PDF, PDF_WORKERS процессов на процесс
+    приложения. Создаётся при первом обращении и заново после fork.
+    """
+    global executor, executor_pid
+    with executor_lock:
+        if executor is None or executor_pid != os.getpid():
+            executor = ProcessPoolExecutor(
+                max_workers=settings.PDF_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=register_font,
+            )
+            executor_pid = os.getpid()
+        return executor
+
+
+def reset_executor(broken):
+    global executor
+    with executor_lock:
+        if executor is broken:
+            executor = None
+    broken.shutdown(wait=False)
+
+
+def render_pdf(title, lines):
+    """
+    Собирает PDF со списком покупок. Если PDF_WORKERS больше нуля,
+    сборка идёт в пуле процессов и не занимает процессор воркера
+    приложения, иначе - в текущем потоке.
+    """
+    if not settings.PDF_WORKERS:
+        return render_shopping_list(title, lines)
+    pool = get_executor()
+    try:
+        future = pool.submit(render_shopping_list, title, lines)
+        return future.result(timeout=settings.PDF_TIMEOUT)
+    except BrokenProcessPool:
+        logger.warning("Пул сборки PDF остановлен, PDF собирается в потоке.")
+        reset_executor(pool)
+        return render_shopping_list(title, lines)
@@ -0,0 +1,34 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+
+LINE_SEPARATOR = "\u2028".encode()
+PARAGRAPH_SEPARATOR = "\u2029".encode()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson. Для строк, целых чисел, списков
+    и словарей результат побайтно совпадает с JSONRenderer:
+    компактные разделители, символы не-ASCII без экранирования,
+    U+2028 и U+2029 экранированы. Остальные типы (даты, Decimal,
+    ленивые строки) кодируются через JSONEncoder DRF. Вещественные
+    числа orjson записывает по-своему, поэтому рендерер подключается
+    только к ответам без них. Ответы с отступами (indent) собирает
+    JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        if (
+            data is None
+            or indent is not None
+            or self.ensure_ascii
+            or not self.compact
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        content = orjson.dumps(data, default=self.encoder_class().default)
+        return content.replace(LINE_SEPARATOR, b"\\u2028").replace(
+            PARAGRAPH_SEPARATOR, b"\\u2029"
+        )
@@ -1,31 +1,91 @@
 import base64
+import tempfile
 
 from djoser.serializers import (
     TokenCreateSerializer,
     UserCreateSerializer,
     UserSerializer,
 )
+from PIL import Image
 from rest_framework import serializers
 
-from django.core.files.base import ContentFile
-from django.shortcuts import get_object_or_404
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
 
+from recipe.images import (
+    IMAGE_VARIANTS,
+    reset_image_variants,
+    schedule_image_variants,
+)
 from recipe.models import Ingredient, Recipe, RecipeIngredient, Tag
 from users.models import User
 from users.validators import validate_username, validate_username_bad_sign
 
+from .catalog import ingredient_catalog
+from .services import set_recipe_ingredients
+
 
 MAX_CHAR_LENGTH = 150
+MAX_AMOUNT = 32767
+MAX_IMAGE_SIZE = 10 * 1024 * 1024
+MAX_IMAGE_SIDE = 8000
+BASE64_CHUNK_SIZE = 64 * 1024
+SPOOL_MAX_SIZE = 1024 * 1024
+MAX_BATCH_SIZE = 100
 
 
 class Base64ImageField(serializers.ImageField):
+    """
+    Изображение в формате data:image/...;base64,...
+    Строка декодируется частями во временный файл. Размер файла
+    проверяется до декодирования, размеры изображения - по заголовку,
+    до полной проверки изображения в ImageField.
+    """
+
+    default_error_messages = {
+        "too_large": "Размер изображения не должен превышать {max_size} Мб.",
+        "too_big": (
+            "Ширина и высота изображения не должны превышать {max_side} px."
+        ),
+    }
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith("data:image"):
-            format, imgstr = data.split(";base64,")
-            ext = format.split("/")[-1]
-            data = ContentFile(base64.b64decode(imgstr), name="temp." + ext)
+            data = self.decode(data)
         return super().to_internal_value(data)
 
+    def decode(self, data):
+        format, _, imgstr = data.partition(";base64,")
+        ext = format.split("/")[-1]
+        if len(imgstr) * 3 // 4 > MAX_IMAGE_SIZE:
+            self.fail("too_large", max_size=MAX_IMAGE_SIZE // 1024 // 1024)
+
+        file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        try:
+            for start in range(0, len(imgstr), BASE64_CHUNK_SIZE):
+                end = start + BASE64_CHUNK_SIZE
+                file.write(base64.b64decode(imgstr[start:end], validate=True))
+            file.seek(0)
+            width, height = Image.open(file).size
+        except (ValueError, OSError, Image.DecompressionBombError):
+            # ValueError - и binascii.Error, и символы не из ASCII.
+            file.close()
+            self.fail("invalid_image")
+        if max(width, height) > MAX_IMAGE_SIDE:
+            file.close()
+            self.fail("too_big", max_side=MAX_IMAGE_SIDE)
+        file.seek(0)
+        return File(file, name="temp." + ext)
+
+
+class BatchIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BATCH_SIZE,
+    )
+
 
 class CustomUserSerializer(UserSerializer):
     is_subscribed = serializers.SerializerMethodField(read_only=True)
@@ -44,6 +104,9 @@ class CustomUserSerializer(UserSerializer):
     def get_is_subscribed(self, obj):
         if not self.context["request"].user.is_authenticated:
             return False
+        is_subscribed = getattr(obj, "is_subscribed", None)
+        if is_subscribed is not None:
+            return is_subscribed
         return (
             self.context["request"].user.follower.filter(author=obj).exists()
         )
@@ -79,6 +142,11 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "measurement_unit")
 
 
+class IngredientAmountSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    amount = serializers.IntegerField(min_value=1, max_value=MAX_AMOUNT)
+
+
 class RecipeIngredientSerializer(serializers.ModelSerializer):
     ingredient = IngredientSerializer()
 
@@ -87,18 +155,12 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         fields = ("id", "ingredient", "amount")
 
     def to_internal_value(self, data):
-        pk = data["id"]
-        amount = int(data["amount"])
-        ingredient = get_object_or_404(Ingredient, pk=pk)
-        data_plus = {
-            "ingredient": {
-                "id": ingredient.pk,
-                "name": ingredient.name,
-                "measurement_unit": ingredient.measurement_unit,
-            },
-            "amount": amount,
+        serializer = IngredientAmountSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        return {
+            "ingredient_id": serializer.validated_data["id"],
+            "amount": serializer.validated_data["amount"],
         }
-        return super().to_internal_value(data_plus)
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
@@ -116,6 +178,7 @@ class RecipeSerializer(serializers.ModelSerializer):
         source="recipe_ingredient", many=True
     )
     image = Base64ImageField(required=True)
+    image_variants = serializers.SerializerMethodField(read_only=True)
     is_favorited = serializers.SerializerMethodField(read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
 
@@ -130,35 +193,111 @@ class RecipeSerializer(serializers.ModelSerializer):
             "is_in_shopping_cart",
             "name",
             "image",
+            "image_variants",
             "text",
             "cooking_time",
         )
 
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
     def save(self, **kwargs):
         self.validated_data["author"] = self.context["request"].user
         return super().save(**kwargs)
 
+    def validate_ingredients(self, value):
+        if not value:
+            raise serializers.ValidationError("Обязательное поле.")
+        ingredient_ids = {ingredient["ingredient_id"] for ingredient in value}
+        if len(ingredient_ids) != len(value):
+            raise serializers.ValidationError(
+                "Ингредиенты не должны повторяться."
+            )
+        missing_ids = ingredient_catalog.get_missing_ids(ingredient_ids)
+        if missing_ids:
+            # Ошибка поля попадает в ответ под ключом "ingredients".
+            raise serializers.ValidationError(
+                [
+                    f"Ингредиента с id {pk} не существует."
+                    for pk in sorted(missing_ids)
+                ]
+            )
+        return value
+
     def create(self, validated_data):
-        validated_data.pop("recipe_ingredient")
-        return super().create(validated_data)
+        tags = validated_data.pop("tags")
+        ingredients = validated_data.pop("recipe_ingredient")
+        with transaction.atomic():
+            recipe = super().create(validated_data)
+            recipe.tags.set(tags)
+            set_recipe_ingredients(recipe, ingredients)
+            schedule_image_variants(recipe)
+        return recipe
+
+    def update(self, instance, validated_data):
+        tags = validated_data.pop("tags", None)
+        ingredients = validated_data.pop("recipe_ingredient", None)
+        with transaction.atomic():
+            if "image" in validated_data:
+                reset_image_variants(instance)
+            recipe = super().update(instance, validated_data)
+            if tags is not None:
+                recipe.tags.set(tags)
+            if ingredients is not None:
+                set_recipe_ingredients(recipe, ingredients)
+            if "image" in validated_data:
+                schedule_image_variants(recipe)
+        return recipe
+
+    def to_representation(self, instance):
+        author_is_subscribed = getattr(instance, "author_is_subscribed", None)
+        if author_is_subscribed is not None:
+            instance.author.is_subscribed = author_is_subscribed
+        return super().to_representation(instance)
+
+    def get_image_variants(self, obj):
+        """
+        Ссылки на уменьшенные копии изображения. Пока копия не готова,
+        вместо неё отдаётся ссылка на оригинал.
+        """
+        if not obj.image:
+            return {}
+        request = self.context.get("request")
+        variants = {}
+        for name in IMAGE_VARIANTS:
+            path = obj.image_variants.get(name)
+            url = default_storage.url(path) if path else obj.image.url
+            variants[name] = (
+                request.build_absolute_uri(url) if request else url
+            )
+        return variants
 
     def get_is_favorited(self, obj):
         user = self.context["request"].user
         if not user.is_authenticated:
             return False
+        is_favorited = getattr(obj, "is_favorited", None)
+        if is_favorited is not None:
+            return is_favorited
         return obj.favored_by.filter(user=user).exists()
 
     def get_is_in_shopping_cart(self, obj):
         user = self.context["request"].user
         if not user.is_authenticated:
             return False
+        is_in_shopping_cart = getattr(obj, "is_in_shopping_cart", None)
+        if is_in_shopping_cart is not None:
+            return is_in_shopping_cart
         return obj.shopping_cart.filter(user=user).exists()
 
 
 class RecipeSubscriptionSerializer(RecipeSerializer):
     class Meta:
         model = Recipe
-        fields = ("id", "name", "image", "cooking_time")
+        fields = ("id", "name", "image", "image_variants", "cooking_time")
 
 
 class SubscriptionsSerializer(serializers.ModelSerializer):
@@ -180,7 +319,12 @@ class SubscriptionsSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        return obj.following.all().exists()
+        is_subscribed = getattr(obj, "is_subscribed", None)
+        if is_subscribed is not None:
+            return is_subscribed
+        return (
+            self.context["request"].user.follower.filter(author=obj).exists()
+        )
 
     def get_recipes(self, obj):
         recipes_limit = self.context["request"].query_params.get(
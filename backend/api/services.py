@@ -0,0 +1,139 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Sum
+
+from recipe.models import RecipeIngredient, ShoppingCart
+
+from .catalog import INGREDIENTS_VERSION
+from .versions import (
+    RECIPES_VERSION,
+    bump_version,
+    get_cart_version_name,
+    get_version,
+    is_cache_shared,
+    schedule_bump_version,
+)
+
+
+SHOPPING_LIST_TIMEOUT = 60 * 60
+
+
+def set_recipe_ingredients(recipe, ingredients):
+    """
+    Приводит ингредиенты рецепта к переданному списку.
+    ingredients - список словарей с ключами ingredient_id и amount.
+    Существующие строки RecipeIngredient сравниваются с новым списком,
+    изменения применяются тремя массовыми запросами: удаление лишних,
+    обновление количества и вставка новых.
+    Вызывать внутри transaction.atomic().
+    Массовые запросы не отправляют сигналы, поэтому, если ингредиенты
+    изменились, после фиксации транзакции здесь же сбрасываются
+    закэшированные рецепты и списки покупок пользователей с этим
+    рецептом.
+    """
+    amounts = {
+        ingredient["ingredient_id"]: ingredient["amount"]
+        for ingredient in ingredients
+    }
+    existing = {
+        recipe_ingredient.ingredient_id: recipe_ingredient
+        for recipe_ingredient in RecipeIngredient.objects.filter(recipe=recipe)
+    }
+
+    to_delete = existing.keys() - amounts.keys()
+    if to_delete:
+        RecipeIngredient.objects.filter(
+            recipe=recipe, ingredient_id__in=to_delete
+        ).delete()
+
+    to_update = []
+    to_create = []
+    for ingredient_id, amount in amounts.items():
+        recipe_ingredient = existing.get(ingredient_id)
+        if recipe_ingredient is None:
+            to_create.append(
+                RecipeIngredient(
+                    recipe=recipe, ingredient_id=ingredient_id, amount=amount
+                )
+            )
+        elif recipe_ingredient.amount != amount:
+            recipe_ingredient.amount = amount
+            to_update.append(recipe_ingredient)
+
+    if to_update:
+        RecipeIngredient.objects.bulk_update(to_update, ["amount"])
+    if to_create:
+        RecipeIngredient.objects.bulk_create(to_create)
+
+    if to_delete or to_update or to_create:
+        schedule_bump_version(RECIPES_VERSION)
+        schedule_cart_changed(
+            ShoppingCart.objects.filter(recipe=recipe).values_list(
+                "user_id", flat=True
+            )
+        )
+
+
+def schedule_cart_changed(user_ids):
+    """
+    Увеличивает версии списков покупок пользователей после фиксации
+    транзакции, чтобы параллельный запрос не закэшировал под новой
+    версией ещё не зафиксированные данные.
+    """
+    names = [get_cart_version_name(user_id) for user_id in user_ids]
+
+    def bump_versions():
+        for name in names:
+            bump_version(name)
+
+    if names:
+        transaction.on_commit(bump_versions)
+
+
+def get_shopping_list_key(user):
+    """Ключ кэша списка покупок, меняется вместе с его содержимым."""
+    return "shopping_list:{}:{}:{}".format(
+        user.pk,
+        get_version(get_cart_version_name(user.pk)),
+        get_version(INGREDIENTS_VERSION),
+    )
+
+
+def aggregate_shopping_list(user):
+    """
+    Ингредиенты из списка покупок пользователя с суммарным количеством:
+    список словарей с ключами name, measurement_unit и amount,
+    по алфавиту. Суммирование - один запрос с GROUP BY по ингредиенту.
+    """
+    return list(
+        RecipeIngredient.objects.filter(
+            recipe_id__in=ShoppingCart.objects.filter(user=user).values(
+                "recipe_id"
+            )
+        )
+        .values("ingredient_id")
+        .annotate(amount=Sum("amount"))
+        .values(
+            "amount",
+            name=F("ingredient__name"),
+            measurement_unit=F("ingredient__measurement_unit"),
+        )
+        .order_by("name", "ingredient_id")
+    )
+
+
+def get_shopping_list(user):
+    """
+    Список покупок пользователя (aggregate_shopping_list), кэшированный
+    по версии списка покупок пользователя и версии справочника
+    ингредиентов. Список покупок меняют и другие процессы приложения,
+    поэтому с кэшем процесса (LocMemCache) список не кэшируется.
+    """
+    if not is_cache_shared():
+        return aggregate_shopping_list(user)
+    key = get_shopping_list_key(user)
+    shopping_list = cache.get(key)
+    if shopping_list is None:
+        shopping_list = aggregate_shopping_list(user)
+        cache.set(key, shopping_list, SHOPPING_LIST_TIMEOUT)
+    return shopping_list
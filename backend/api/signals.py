@@ -0,0 +1,66 @@
+from rest_framework.authtoken.models import Token
+
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from recipe.models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+)
+from users.models import User
+
+from .authentication import schedule_auth_changed
+from .catalog import INGREDIENTS_VERSION
+from .services import schedule_cart_changed
+from .versions import RECIPES_VERSION, TAGS_VERSION, schedule_bump_version
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def ingredients_changed(**kwargs):
+    schedule_bump_version(INGREDIENTS_VERSION)
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def tags_changed(**kwargs):
+    schedule_bump_version(TAGS_VERSION)
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+@receiver([post_save, post_delete], sender=RecipeIngredient)
+def recipes_changed(**kwargs):
+    schedule_bump_version(RECIPES_VERSION)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        schedule_bump_version(RECIPES_VERSION)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def shopping_cart_saved(instance, created, **kwargs):
+    if created:
+        schedule_cart_changed([instance.user_id])
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def shopping_cart_deleted(instance, **kwargs):
+    schedule_cart_changed([instance.user_id])
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(instance, **kwargs):
+    schedule_auth_changed([instance.key])
+
+
+@receiver(post_save, sender=User)
+def user_saved(instance, created, update_fields, **kwargs):
+    if created or update_fields == frozenset(["last_login"]):
+        return
+    schedule_bump_version(RECIPES_VERSION)
+    schedule_auth_changed(
+        Token.objects.filter(user=instance).values_list("key", flat=True)
+    )
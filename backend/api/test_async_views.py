@@ -0,0 +1,66 @@
+import asyncio
+from unittest import mock
+
+from rest_framework.test import APITestCase
+from rest_framework.throttling import BaseThrottle
+
+from django.core.exceptions import PermissionDenied
+from django.urls import resolve
+
+from users.models import User
+
+from .views import FavoriteView
+
+
+class DenyThrottle(BaseThrottle):
+    def allow_request(self, request, view):
+        return False
+
+
+class AsyncAPIViewTest(APITestCase):
+    """
+    Асинхронные представления связей проходят весь dispatch DRF:
+    права, ограничения частоты и EXCEPTION_HANDLER.
+    """
+
+    url = "/api/recipes/1/favorite/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="reader",
+            email="reader@example.com",
+            password="Password-1234",
+            first_name="Читатель",
+            last_name="Рецептов",
+        )
+
+    def test_view_is_coroutine(self):
+        self.assertTrue(asyncio.iscoroutinefunction(resolve(self.url).func))
+
+    def test_anonymous_is_unauthorized(self):
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 401)
+        self.assertIn("WWW-Authenticate", response)
+
+    def test_django_permission_denied(self):
+        self.client.force_authenticate(self.user)
+        with mock.patch.object(
+            FavoriteView, "create", side_effect=PermissionDenied
+        ):
+            response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 403)
+        self.assertIn("detail", response.json())
+
+    def test_throttles(self):
+        self.client.force_authenticate(self.user)
+        with mock.patch.object(
+            FavoriteView, "throttle_classes", [DenyThrottle]
+        ):
+            response = self.client.delete(self.url)
+        self.assertEqual(response.status_code, 429)
+
+    def test_method_not_allowed(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 405)
@@ -0,0 +1,90 @@
+import tempfile
+import threading
+
+from rest_framework.test import APITestCase
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from recipe.models import Recipe
+from users.models import User
+
+from .versions import RECIPES_VERSION, bump_version
+
+
+LOCAL_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+class AnonymousCacheTest(APITestCase):
+    """
+    Ответы анонимам кэшируются только в общем кэше, и запись в другом
+    процессе меняет ключ кэша.
+    """
+
+    url = "/api/recipes/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username="author",
+            email="author@example.com",
+            password="Password-1234",
+            first_name="Автор",
+            last_name="Рецептов",
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.author,
+            name="Рецепт",
+            text="Описание",
+            cooking_time=5,
+            image="recipes/images/recipe.png",
+        )
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        # Файловый кэш общий для процессов и ничего не хранит в памяти.
+        shared_caches = override_settings(
+            CACHES={
+                "default": {
+                    "BACKEND": (
+                        "django.core.cache.backends.filebased.FileBasedCache"
+                    ),
+                    "LOCATION": directory.name,
+                }
+            }
+        )
+        shared_caches.enable()
+        self.addCleanup(shared_caches.disable)
+
+    def get(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+
+    def test_shared_cache_serves_repeated_requests(self):
+        self.get()
+        _, queries = self.get()
+        self.assertEqual(queries, 0)
+
+    def test_write_in_other_process_changes_key(self):
+        response, _ = self.get()
+        self.assertEqual(response.data["results"][0]["name"], "Рецепт")
+        Recipe.objects.filter(pk=self.recipe.pk).update(name="Новый")
+        # Соединения с кэшем у каждого потока свои, так что поток
+        # с записью ведёт себя как другой процесс.
+        writer = threading.Thread(target=bump_version, args=[RECIPES_VERSION])
+        writer.start()
+        writer.join()
+        response, queries = self.get()
+        self.assertGreater(queries, 0)
+        self.assertEqual(response.data["results"][0]["name"], "Новый")
+
+    @override_settings(CACHES=LOCAL_CACHES)
+    def test_local_cache_is_not_used(self):
+        self.get()
+        _, queries = self.get()
+        self.assertGreater(queries, 0)
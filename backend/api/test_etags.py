@@ -0,0 +1,50 @@
+from rest_framework.test import APITestCase
+
+from django.test.utils import override_settings
+
+from recipe.models import Ingredient, Tag
+
+from .catalog import ingredient_catalog, tags_snapshot
+
+
+LOCAL_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class CatalogETagTest(APITestCase):
+    """Условные запросы тэгов и ингредиентов не обращаются к базе."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tag = Tag.objects.create(name="Завтрак", color="#E26C2D")
+        Ingredient.objects.create(name="соль", measurement_unit="г")
+
+    def setUp(self):
+        # Снимки процесса не должны переходить из одного теста в другой.
+        for snapshot in (tags_snapshot, ingredient_catalog):
+            snapshot._version = None
+
+    def assert_not_modified(self, url):
+        etag = self.client.get(url)["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        return etag
+
+    def test_tags_not_modified_without_queries(self):
+        self.assert_not_modified("/api/tags/")
+        self.assert_not_modified(f"/api/tags/{self.tag.pk}/")
+
+    def test_ingredients_not_modified_without_queries(self):
+        self.assert_not_modified("/api/ingredients/")
+
+    def test_tag_change_changes_etag(self):
+        etag = self.assert_not_modified("/api/tags/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.color = "#8775D2"
+            self.tag.save()
+        response = self.client.get("/api/tags/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
@@ -0,0 +1,115 @@
+import csv
+import io
+import json
+
+from rest_framework.test import APITestCase
+
+from django.test.utils import override_settings
+
+from recipe.models import Ingredient, Recipe, RecipeIngredient, ShoppingCart
+from users.models import User
+
+
+LOCAL_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class ShoppingCartExportTest(APITestCase):
+    """Выгрузка списка покупок в разных форматах и её ETag."""
+
+    url = "/api/recipes/download_shopping_cart/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(
+            username="reader",
+            email="reader@example.com",
+            password="Password-1234",
+            first_name="Читатель",
+            last_name="Рецептов",
+        )
+        salt = Ingredient.objects.create(name="соль", measurement_unit="г")
+        milk = Ingredient.objects.create(name="молоко", measurement_unit="мл")
+        cls.recipes = []
+        for number in range(3):
+            recipe = Recipe.objects.create(
+                author=cls.reader,
+                name=f"Рецепт {number}",
+                text="Описание",
+                cooking_time=5,
+                image=f"recipes/images/recipe_{number}.png",
+            )
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=salt, amount=number + 1
+            )
+            if number:
+                RecipeIngredient.objects.create(
+                    recipe=recipe, ingredient=milk, amount=200
+                )
+            cls.recipes.append(recipe)
+        for recipe in cls.recipes[:2]:
+            ShoppingCart.objects.create(user=cls.reader, recipe=recipe)
+
+    def setUp(self):
+        self.client.force_authenticate(self.reader)
+
+    def download(self, format, **headers):
+        return self.client.get(self.url, {"format": format}, **headers)
+
+    def get_content(self, format, content_type):
+        response = self.download(format)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], content_type)
+        self.assertIn(f'.{format}"', response["Content-Disposition"])
+        return b"".join(response.streaming_content).decode()
+
+    def test_txt(self):
+        content = self.get_content("txt", "text/plain; charset=utf-8")
+        self.assertEqual(content, "молоко (мл) - 200\nсоль (г) - 3\n")
+
+    def test_csv(self):
+        content = self.get_content("csv", "text/csv; charset=utf-8")
+        self.assertEqual(
+            list(csv.reader(io.StringIO(content))),
+            [
+                ["name", "measurement_unit", "amount"],
+                ["молоко", "мл", "200"],
+                ["соль", "г", "3"],
+            ],
+        )
+
+    def test_json(self):
+        content = self.get_content("json", "application/json")
+        self.assertEqual(
+            json.loads(content),
+            [
+                {"name": "молоко", "measurement_unit": "мл", "amount": 200},
+                {"name": "соль", "measurement_unit": "г", "amount": 3},
+            ],
+        )
+
+    def test_unknown_format(self):
+        self.assertEqual(self.download("xml").status_code, 404)
+
+    def test_pdf(self):
+        response = self.download("pdf")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertTrue(
+            b"".join(response.streaming_content).startswith(b"%PDF")
+        )
+
+    def test_etag(self):
+        etags = {}
+        for format in ("pdf", "txt"):
+            etags[format] = self.download(format)["ETag"]
+            response = self.download(format, HTTP_IF_NONE_MATCH=etags[format])
+            self.assertEqual(response.status_code, 304)
+        self.assertNotEqual(etags["pdf"], etags["txt"])
+
+        ShoppingCart.objects.create(user=self.reader, recipe=self.recipes[2])
+        response = self.download("pdf", HTTP_IF_NONE_MATCH=etags["pdf"])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etags["pdf"])
@@ -0,0 +1,126 @@
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from django.test.utils import override_settings
+
+from recipe.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+)
+from users.models import Subscription, User
+
+
+LOCAL_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+def create_user(username):
+    return User.objects.create_user(
+        username=username,
+        email=f"{username}@example.com",
+        password="Password-1234",
+        first_name="Имя",
+        last_name="Фамилия",
+    )
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class QueryCountTest(APITestCase):
+    """
+    Число запросов к базе не зависит от числа рецептов и авторов:
+    флаги пользователя - подзапросы Exists, связи - prefetch_related.
+    В число запросов входит проверка токена.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user("reader")
+        cls.token = Token.objects.create(user=cls.reader)
+        cls.tags = [
+            Tag.objects.create(name="Завтрак", color="#E26C2D"),
+            Tag.objects.create(name="Ужин", color="#8775D2"),
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(name="соль", measurement_unit="г"),
+            Ingredient.objects.create(name="молоко", measurement_unit="мл"),
+        ]
+        cls.author = create_user("author")
+        cls.recipes = cls.add_recipes(create_user("other"), 2)
+        cls.recipes += cls.add_recipes(cls.author, 5)
+        Subscription.objects.create(user=cls.reader, author=cls.author)
+        Favorite.objects.create(user=cls.reader, recipe=cls.recipes[0])
+        ShoppingCart.objects.create(user=cls.reader, recipe=cls.recipes[2])
+
+    @classmethod
+    def add_recipes(cls, author, recipes_count):
+        recipes = []
+        for number in range(recipes_count):
+            recipe = Recipe.objects.create(
+                author=author,
+                name=f"Рецепт {number}",
+                text="Описание",
+                cooking_time=5,
+                image=f"recipes/images/{author.username}_{number}.png",
+            )
+            recipe.tags.set(cls.tags)
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=1
+                )
+                for ingredient in cls.ingredients
+            )
+            recipes.append(recipe)
+        return recipes
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def get(self, url, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_recipes_list(self):
+        data = self.get("/api/recipes/?limit=10", 5)
+        self.assertEqual(len(data["results"]), len(self.recipes))
+        self.assertTrue(
+            all(
+                len(recipe["tags"]) == 2 and len(recipe["ingredients"]) == 2
+                for recipe in data["results"]
+            )
+        )
+
+    def test_recipe_detail(self):
+        data = self.get(f"/api/recipes/{self.recipes[0].pk}/", 4)
+        self.assertEqual(len(data["ingredients"]), 2)
+
+    def test_subscriptions(self):
+        data = self.get("/api/users/subscriptions/?recipes_limit=3", 4)
+        self.assertEqual(
+            [len(author["recipes"]) for author in data["results"]], [3]
+        )
+
+    def test_exists_annotations(self):
+        data = self.get("/api/recipes/?limit=10", 5)
+        flags = {
+            recipe["id"]: (
+                recipe["is_favorited"],
+                recipe["is_in_shopping_cart"],
+                recipe["author"]["is_subscribed"],
+            )
+            for recipe in data["results"]
+        }
+        first, second, third = self.recipes[:3]
+        self.assertEqual(flags[first.pk], (True, False, False))
+        self.assertEqual(flags[second.pk], (False, False, False))
+        self.assertEqual(flags[third.pk], (False, True, True))
+
+    def test_requested_fields_skip_joins(self):
+        data = self.get("/api/recipes/?limit=10&fields=id,name", 3)
+        self.assertEqual(set(data["results"][0]), {"id", "name"})
@@ -0,0 +1,182 @@
+import base64
+import io
+
+from PIL import Image
+from rest_framework import serializers
+from rest_framework.test import APITestCase
+
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+
+from recipe.models import Ingredient, Recipe, RecipeIngredient
+from users.models import User
+
+from .catalog import ingredient_catalog
+from .serializers import MAX_IMAGE_SIDE, MAX_IMAGE_SIZE, Base64ImageField
+from .services import set_recipe_ingredients
+
+
+LOCAL_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class RecipeIngredientsTest(APITestCase):
+    """Запись ингредиентов рецепта через API."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username="author",
+            email="author@example.com",
+            password="Password-1234",
+            first_name="Автор",
+            last_name="Рецептов",
+        )
+        cls.salt = Ingredient.objects.create(name="соль", measurement_unit="г")
+        cls.milk = Ingredient.objects.create(
+            name="молоко", measurement_unit="мл"
+        )
+        cls.pepper = Ingredient.objects.create(
+            name="перец", measurement_unit="г"
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.author,
+            name="Рецепт",
+            text="Описание",
+            cooking_time=5,
+            image="recipes/images/recipe.png",
+        )
+        for ingredient in (cls.salt, cls.pepper):
+            RecipeIngredient.objects.create(
+                recipe=cls.recipe, ingredient=ingredient, amount=1
+            )
+
+    def setUp(self):
+        ingredient_catalog._version = None
+        self.client.force_authenticate(self.author)
+        self.url = f"/api/recipes/{self.recipe.pk}/"
+
+    def patch_ingredients(self, ingredients):
+        return self.client.patch(
+            self.url, {"ingredients": ingredients}, format="json"
+        )
+
+    def get_amounts(self):
+        return dict(
+            RecipeIngredient.objects.filter(recipe=self.recipe).values_list(
+                "ingredient_id", "amount"
+            )
+        )
+
+    def test_ingredients_are_diffed(self):
+        salt = RecipeIngredient.objects.get(
+            recipe=self.recipe, ingredient=self.salt
+        )
+        response = self.patch_ingredients(
+            [
+                {"id": self.salt.pk, "amount": 5},
+                {"id": self.milk.pk, "amount": 200},
+            ]
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.get_amounts(), {self.salt.pk: 5, self.milk.pk: 200}
+        )
+        # Строка с изменённым количеством обновляется, а не пересоздаётся.
+        self.assertTrue(
+            RecipeIngredient.objects.filter(pk=salt.pk, amount=5).exists()
+        )
+        self.assertEqual(
+            sorted(
+                (ingredient["name"], ingredient["amount"])
+                for ingredient in response.json()["ingredients"]
+            ),
+            [("молоко", 200), ("соль", 5)],
+        )
+
+    def test_unchanged_ingredients(self):
+        ingredients = [
+            {"ingredient_id": self.salt.pk, "amount": 1},
+            {"ingredient_id": self.pepper.pk, "amount": 1},
+        ]
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertNumQueries(1):
+                set_recipe_ingredients(self.recipe, ingredients)
+        # Кэши рецептов и списков покупок не сбрасываются.
+        self.assertEqual(callbacks, [])
+
+    def test_duplicate_ingredients(self):
+        response = self.patch_ingredients(
+            [
+                {"id": self.salt.pk, "amount": 1},
+                {"id": self.salt.pk, "amount": 2},
+            ]
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("ingredients", response.json())
+
+    def test_unknown_ingredients(self):
+        response = self.patch_ingredients(
+            [
+                {"id": 999, "amount": 1},
+                {"id": self.salt.pk, "amount": 2},
+                {"id": 998, "amount": 1},
+            ]
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(),
+            {
+                "ingredients": [
+                    "Ингредиента с id 998 не существует.",
+                    "Ингредиента с id 999 не существует.",
+                ]
+            },
+        )
+        self.assertEqual(
+            self.get_amounts(), {self.salt.pk: 1, self.pepper.pk: 1}
+        )
+
+
+def make_image_data(size, format="PNG"):
+    image = io.BytesIO()
+    Image.new("RGB", size).save(image, format)
+    content = base64.b64encode(image.getvalue()).decode()
+    return f"data:image/{format.lower()};base64,{content}"
+
+
+class Base64ImageFieldTest(SimpleTestCase):
+    """Проверки Base64ImageField до полного декодирования изображения."""
+
+    def get_error_codes(self, data):
+        with self.assertRaises(serializers.ValidationError) as context:
+            Base64ImageField().run_validation(data)
+        return context.exception.get_codes()
+
+    def test_valid_image(self):
+        file = Base64ImageField().run_validation(make_image_data((4, 3)))
+        self.assertEqual(file.name, "temp.png")
+        self.assertEqual(Image.open(file).size, (4, 3))
+
+    def test_too_large(self):
+        content = "A" * (MAX_IMAGE_SIZE * 4 // 3 + 4)
+        self.assertEqual(
+            self.get_error_codes(f"data:image/png;base64,{content}"),
+            ["too_large"],
+        )
+
+    def test_too_big(self):
+        self.assertEqual(
+            self.get_error_codes(make_image_data((MAX_IMAGE_SIDE + 1, 1))),
+            ["too_big"],
+        )
+
+    def test_invalid_image(self):
+        for data in (
+            "data:image/png;base64,не base64",
+            "data:image/png;base64," + base64.b64encode(b"text").decode(),
+        ):
+            with self.subTest(data=data):
+                self.assertEqual(self.get_error_codes(data), ["invalid_image"])
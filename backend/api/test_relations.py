@@ -0,0 +1,159 @@
+from rest_framework.test import APITransactionTestCase
+
+from django.test.utils import override_settings
+
+from recipe.models import FeedEntry, Recipe, ShoppingCart
+from users.models import Subscription, User
+
+from .serializers import MAX_BATCH_SIZE
+from .versions import get_cart_version_name, get_version
+
+
+LOCAL_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+def create_user(username):
+    return User.objects.create_user(
+        username=username,
+        email=f"{username}@example.com",
+        password="Password-1234",
+        first_name="Имя",
+        last_name="Фамилия",
+    )
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class RelationsTest(APITransactionTestCase):
+    """
+    Запросы с одним объектом и пакетные запросы одинаково обновляют
+    счётчики, ленты и версии списка покупок. Представления связей
+    работают с базой в пуле потоков, поэтому данные теста фиксируются
+    (APITransactionTestCase).
+    """
+
+    def setUp(self):
+        self.author = create_user("author")
+        self.reader = create_user("reader")
+        self.recipes = [
+            Recipe.objects.create(
+                author=self.author,
+                name=f"Рецепт {number}",
+                text="Описание",
+                cooking_time=5,
+                image=f"recipes/images/recipe_{number}.png",
+            )
+            for number in range(3)
+        ]
+        Recipe.objects.update(fanned_out=True)
+        self.client.force_authenticate(self.reader)
+
+    def request(self, method, url, data=None):
+        return getattr(self.client, method)(url, data, format="json")
+
+    def get_favorites_counts(self):
+        return list(
+            Recipe.objects.order_by("id").values_list(
+                "favorites_count", flat=True
+            )
+        )
+
+    def get_statuses(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [result["status"] for result in response.data["results"]]
+
+    def test_favorites_counters(self):
+        first, second, third = [recipe.pk for recipe in self.recipes]
+        response = self.request(
+            "post", "/api/recipes/favorite/", {"ids": [first, second, 999]}
+        )
+        self.assertEqual(self.get_statuses(response), [201, 201, 404])
+        self.assertEqual(self.get_favorites_counts(), [1, 1, 0])
+
+        response = self.request("post", f"/api/recipes/{third}/favorite/")
+        self.assertEqual(response.status_code, 201)
+        response = self.request(
+            "post", "/api/recipes/favorite/", {"ids": [third]}
+        )
+        self.assertEqual(self.get_statuses(response), [400])
+        self.assertEqual(self.get_favorites_counts(), [1, 1, 1])
+
+        response = self.request(
+            "delete", "/api/recipes/favorite/", {"ids": [first, third]}
+        )
+        self.assertEqual(self.get_statuses(response), [204, 204])
+        response = self.request("delete", f"/api/recipes/{second}/favorite/")
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.get_favorites_counts(), [0, 0, 0])
+
+    def test_shopping_cart_versions(self):
+        name = get_cart_version_name(self.reader.pk)
+        ids = [recipe.pk for recipe in self.recipes]
+        requests = [
+            ("post", "/api/recipes/shopping_cart/", {"ids": ids[:2]}),
+            ("post", f"/api/recipes/{ids[2]}/shopping_cart/", None),
+            ("delete", "/api/recipes/shopping_cart/", {"ids": ids[:2]}),
+            ("delete", f"/api/recipes/{ids[2]}/shopping_cart/", None),
+        ]
+        for method, url, data in requests:
+            with self.subTest(method=method, url=url):
+                version = get_version(name)
+                response = self.request(method, url, data)
+                self.assertLess(response.status_code, 300)
+                self.assertNotEqual(get_version(name), version)
+        self.assertFalse(ShoppingCart.objects.exists())
+
+    def test_subscriptions_counters_and_feed(self):
+        other = create_user("other")
+        response = self.request(
+            "post",
+            "/api/users/subscribe/",
+            {"ids": [self.author.pk, self.reader.pk]},
+        )
+        self.assertEqual(self.get_statuses(response), [201, 400])
+        response = self.request("post", f"/api/users/{other.pk}/subscribe/")
+        self.assertEqual(response.status_code, 201)
+        self.author.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(
+            (self.author.followers_count, other.followers_count), (1, 1)
+        )
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(),
+            len(self.recipes),
+        )
+
+        response = self.request(
+            "delete",
+            "/api/users/subscribe/",
+            {"ids": [self.author.pk, other.pk]},
+        )
+        self.assertEqual(self.get_statuses(response), [204, 204])
+        self.author.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(
+            (self.author.followers_count, other.followers_count), (0, 0)
+        )
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+        self.assertFalse(Subscription.objects.exists())
+
+    def test_batch_ids_validation(self):
+        for ids in ([], [0], ["id"], list(range(1, MAX_BATCH_SIZE + 2))):
+            with self.subTest(ids=ids):
+                response = self.request(
+                    "post", "/api/recipes/shopping_cart/", {"ids": ids}
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("ids", response.data)
+        self.assertFalse(ShoppingCart.objects.exists())
+
+    def test_batch_duplicate_ids(self):
+        recipe = self.recipes[0]
+        response = self.request(
+            "post",
+            "/api/recipes/shopping_cart/",
+            {"ids": [recipe.pk, recipe.pk]},
+        )
+        self.assertEqual(self.get_statuses(response), [201])
+        self.assertEqual(ShoppingCart.objects.count(), 1)
@@ -0,0 +1,102 @@
+from urllib.parse import urlencode
+
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from django.contrib.auth.models import AnonymousUser
+from django.test import TestCase
+
+from recipe.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+)
+from users.models import Subscription, User
+
+from .management.commands.check_fast_serializers import get_view
+
+
+class FastRecipeListTest(TestCase):
+    """
+    Быстрый путь списка рецептов (RecipeRowSerializer и
+    FastJSONRenderer) отдаёт побайтно тот же ответ, что и
+    RecipeSerializer с JSONRenderer.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username="author",
+            email="author@example.com",
+            password="Password-1234",
+            first_name="Автор",
+            last_name="Рецептов",
+        )
+        cls.reader = User.objects.create_user(
+            username="reader",
+            email="reader@example.com",
+            password="Password-1234",
+            first_name="Читатель",
+            last_name="Ленты",
+        )
+        breakfast = Tag.objects.create(name="Завтрак", color="#E26C2D")
+        dinner = Tag.objects.create(name="Ужин", color="#8775D2")
+        salt = Ingredient.objects.create(name="соль", measurement_unit="г")
+        milk = Ingredient.objects.create(name="молоко", measurement_unit="мл")
+        for number in range(4):
+            recipe = Recipe.objects.create(
+                author=cls.author if number % 2 else cls.reader,
+                name=f"Рецепт {number}",
+                text="Описание\u2028с разделителем строк «ё»",
+                cooking_time=5 + number,
+                image=f"recipes/images/recipe_{number}.png",
+                image_variants=(
+                    {"card": f"recipes/images/variants/{number}_card.jpg"}
+                    if number % 2
+                    else {}
+                ),
+            )
+            recipe.tags.set([breakfast] if number % 2 else [dinner, breakfast])
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=salt, amount=number + 1
+            )
+            if number > 1:
+                RecipeIngredient.objects.create(
+                    recipe=recipe, ingredient=milk, amount=200
+                )
+            if number < 2:
+                Favorite.objects.create(user=cls.reader, recipe=recipe)
+            if number != 1:
+                ShoppingCart.objects.create(user=cls.reader, recipe=recipe)
+        Subscription.objects.create(user=cls.reader, author=cls.author)
+
+    def render(self, fast, user, query):
+        request = APIRequestFactory().get(f"/api/recipes/?{query}")
+        if user.is_authenticated:
+            force_authenticate(request, user=user)
+        response = get_view(fast)(request)
+        response.render()
+        return response.status_code, response.content
+
+    def test_fast_list_matches_serializer(self):
+        queries = [
+            {},
+            {"limit": 2},
+            {"limit": 2, "page": 2},
+            {"is_favorited": 1},
+            {"is_in_shopping_cart": 1},
+            {"tags": list(Tag.objects.values_list("slug", flat=True))},
+            {"author": self.author.pk},
+            {"fields": "id,name,author"},
+            {"fields": "image,image_variants,tags,is_favorited"},
+            {"fields": "ingredients,is_in_shopping_cart,cooking_time"},
+        ]
+        for user in (AnonymousUser(), self.author, self.reader):
+            for params in queries:
+                query = urlencode(params, doseq=True)
+                with self.subTest(user=str(user), query=query):
+                    expected = self.render(False, user, query)
+                    self.assertEqual(expected[0], 200)
+                    self.assertEqual(self.render(True, user, query), expected)
@@ -3,11 +3,16 @@ from rest_framework import routers
 from django.urls import include, path
 
 from .views import (
+    FavoriteBatchView,
     FavoriteView,
+    FeedViewSet,
     IngredientViewSet,
+    MetricsView,
     RecipeViewSet,
+    ShoppingCartBatchView,
     ShoppingCartCreateDeleteView,
     ShoppingCartView,
+    SubscribeBatchView,
     SubscribesListView,
     SubscribeUnsubscribeView,
     TagViewSet,
@@ -23,11 +28,16 @@ router.register(r"ingredients", IngredientViewSet)
 
 urlpatterns = [
     path("auth/", include("djoser.urls.authtoken")),
+    path("metrics/", MetricsView.as_view()),
     path("users/", UsersListView.as_view({"get": "list", "post": "create"})),
     path("users/subscriptions/", SubscribesListView.as_view()),
+    path("users/subscribe/", SubscribeBatchView.as_view()),
     path("users/<int:id>/subscribe/", SubscribeUnsubscribeView.as_view()),
+    path("recipes/favorite/", FavoriteBatchView.as_view()),
     path("recipes/<int:id>/favorite/", FavoriteView.as_view()),
     path("recipes/download_shopping_cart/", ShoppingCartView.as_view()),
+    path("recipes/feed/", FeedViewSet.as_view({"get": "list"})),
+    path("recipes/shopping_cart/", ShoppingCartBatchView.as_view()),
     path(
         "recipes/<int:id>/shopping_cart/",
         ShoppingCartCreateDeleteView.as_view(),
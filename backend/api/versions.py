@@ -0,0 +1,62 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+TAGS_VERSION = "tags"
+RECIPES_VERSION = "recipes"
+LOCAL_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def is_cache_shared():
+    """
+    Кэш по умолчанию общий для всех процессов приложения.
+    В кэше процесса (LocMemCache) версии не видят изменений, сделанных
+    другими процессами, поэтому данные, которые должны сбрасываться
+    сразу после записи, при таком кэше не кэшируются.
+    """
+    return settings.CACHES["default"]["BACKEND"] not in LOCAL_CACHE_BACKENDS
+
+
+def get_cart_version_name(user_id):
+    """Имя версии списка покупок пользователя."""
+    return f"cart:{user_id}"
+
+
+def get_version_key(name):
+    return f"version:{name}"
+
+
+def get_version(name):
+    """
+    Текущая версия набора данных name.
+    Версия хранится в кэше без срока жизни. Если ключ пропал из кэша,
+    он заново создаётся со значением от текущего времени, поэтому новая
+    версия не совпадёт ни с одной из выданных ранее.
+    """
+    key = get_version_key(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(name):
+    """Увеличивает версию набора данных name и возвращает новое значение."""
+    key = get_version_key(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+        return cache.get(key)
+
+
+def schedule_bump_version(name):
+    """Увеличивает версию набора данных name после фиксации транзакции."""
+    transaction.on_commit(lambda: bump_version(name))
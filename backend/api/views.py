@@ -1,21 +1,37 @@
 import datetime
+import hashlib
+import json
+from functools import update_wrapper
+from io import BytesIO
 
+from asgiref.sync import sync_to_async
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
-from rest_framework import filters, generics, serializers, status, viewsets
+from rest_framework import generics, serializers, status, viewsets
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import (
+    IsAdminUser,
     IsAuthenticated,
     IsAuthenticatedOrReadOnly,
 )
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 
-from django.db.models import Count
-from django.http import HttpResponse
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import Exists, OuterRef, Prefetch, Subquery
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 
 from recipe.models import (
     Favorite,
@@ -25,156 +41,399 @@ from recipe.models import (
     ShoppingCart,
     Tag,
 )
+from recipe.relations import (
+    favorites_changed,
+    lock_user_relations,
+    subscriptions_created,
+)
 from users.models import Subscription, User
 
+from .caching import AnonymousCacheMixin
+from .catalog import INGREDIENTS_VERSION, ingredient_catalog, tags_snapshot
+from .exports import EXPORT_FORMATS
+from .fast_serializers import FastRecipeListMixin
 from .filters import RecipeFilter
-from .pagination import PageLimitPagination
+from .metrics import render_metrics
+from .pagination import (
+    FeedPagination,
+    PageLimitPagination,
+    RecipeCursorPagination,
+)
+from .pdf import render_pdf
 from .permissions import IsAuthor
+from .renderers import FastJSONRenderer
 from .serializers import (
+    BatchIdsSerializer,
     IngredientSerializer,
     RecipeSerializer,
     RecipeSubscriptionSerializer,
     SubscriptionsSerializer,
     TagSerializer,
 )
+from .services import (
+    SHOPPING_LIST_TIMEOUT,
+    get_shopping_list,
+    schedule_cart_changed,
+)
+from .versions import RECIPES_VERSION, TAGS_VERSION
+
+
+def accepts_gzip(request):
+    return "gzip" in request.META.get("HTTP_ACCEPT_ENCODING", "")
+
+
+def is_full_ingredients_list(request):
+    return not (
+        request.query_params.get(api_settings.SEARCH_PARAM)
+        or request.query_params.get("limit")
+    )
+
+
+def tags_etag(request, *args, **kwargs):
+    """ETag тэгов - хэш их данных, одинаковый во всех процессах."""
+    return f"tags-{tags_snapshot.get_etag()}"
+
+
+def ingredients_etag(request, *args, **kwargs):
+    """ETag ингредиентов - хэш справочника процесса."""
+    etag = f"ingredients-{ingredient_catalog.get_etag()}"
+    if "pk" not in kwargs and is_full_ingredients_list(request):
+        if accepts_gzip(request):
+            etag += "-gzip"
+    return etag
+
+
+def get_shopping_cart_date():
+    return datetime.datetime.now().strftime("%d-%m-%y")
+
+
+def get_shopping_cart_format(request):
+    return request.query_params.get("format", "pdf")
+
+
+def get_request_shopping_list(request):
+    """Список покупок пользователя, читается один раз за запрос."""
+    if not hasattr(request, "shopping_list"):
+        request.shopping_list = get_shopping_list(request.user)
+    return request.shopping_list
+
 
+def shopping_cart_etag(request, *args, **kwargs):
+    """
+    ETag выгрузки списка покупок: хэш содержимого списка, формата
+    и даты в заголовке. ETag зависит только от данных, поэтому
+    совпадает во всех процессах приложения, а PDF с одинаковым ETag
+    собирается побайтно одинаковым.
+    """
+    content = json.dumps(
+        [
+            get_request_shopping_list(request),
+            get_shopping_cart_format(request),
+            get_shopping_cart_date(),
+        ],
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha1(content.encode()).hexdigest()
 
+
+def database_sync_to_async(func):
+    """
+    sync_to_async для работы с базой из асинхронных представлений.
+    Функция выполняется в общем пуле потоков, а не в единственном
+    потоке thread_sensitive. Соединение с базой открывается и
+    закрывается в том же потоке, по правилам CONN_MAX_AGE.
+    """
+
+    def wrapper(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(wrapper, thread_sensitive=False)
+
+
+class AsyncAPIView(APIView):
+    """
+    Асинхронное представление DRF. Весь dispatch DRF - аутентификация,
+    права, ограничения частоты, согласование формата, обработка ошибок
+    EXCEPTION_HANDLER и рендеринг ответа - выполняется в пуле потоков,
+    event loop в это время обслуживает другие запросы. POST и DELETE
+    вызывают create и destroy.
+    """
+
+    permission_classes = [
+        IsAuthenticated,
+    ]
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        """
+        В Django 3.2 асинхронными могут быть только функции-представления,
+        поэтому представление класса оборачивается в корутину.
+        """
+        view = super().as_view(**initkwargs)
+
+        def render_view(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            if hasattr(response, "render"):
+                response.render()
+            return response
+
+        async def async_view(request, *args, **kwargs):
+            return await database_sync_to_async(render_view)(
+                request, *args, **kwargs
+            )
+
+        update_wrapper(async_view, view)
+        return async_view
+
+    def post(self, request, *args, **kwargs):
+        return self.create(request, *args, **kwargs)
+
+    def delete(self, request, *args, **kwargs):
+        return self.destroy(request, *args, **kwargs)
+
+
+@method_decorator(condition(etag_func=tags_etag), name="list")
+@method_decorator(condition(etag_func=tags_etag), name="retrieve")
 class TagViewSet(viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     http_method_names = ["get"]
     pagination_class = None
+    authentication_classes = []
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    AnonymousCacheMixin, FastRecipeListMixin, viewsets.ModelViewSet
+):
     serializer_class = RecipeSerializer
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+    cache_versions = (RECIPES_VERSION, TAGS_VERSION, INGREDIENTS_VERSION)
+    cache_sorted_params = ("tags",)
     pagination_class = PageLimitPagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     permission_classes = [IsAuthenticatedOrReadOnly, IsAuthor]
 
+    @property
+    def paginator(self):
+        """
+        Постраничный вывод по курсору, если передан параметр cursor,
+        иначе - по номеру страницы. Курсор упорядочивает по (pub_date,
+        id), поэтому результаты поиска (search), отсортированные
+        по релевантности, всегда выводятся по номеру страницы.
+        """
+        if not hasattr(self, "_paginator"):
+            params = self.request.query_params
+            cursor = RecipeCursorPagination.cursor_query_param in params
+            if cursor and not params.get("search"):
+                self._paginator = RecipeCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def get_requested_fields(self):
+        """Поля рецепта из параметра ?fields= (None - все поля)."""
+        if self.action not in ("list", "retrieve"):
+            return None
+        fields = self.request.query_params.get("fields")
+        if not fields:
+            return None
+        fields = set(fields.split(",")) & set(RecipeSerializer.Meta.fields)
+        return fields or None
+
     def get_queryset(self):
-        return Recipe.objects.select_related("author").prefetch_related(
-            "tags", "ingredients"
-        )
+        fields = self.get_requested_fields() or RecipeSerializer.Meta.fields
+        queryset = Recipe.objects.defer("search_vector")
+        if "author" in fields:
+            queryset = queryset.select_related("author")
+        if "tags" in fields:
+            queryset = queryset.prefetch_related("tags")
+        if "ingredients" in fields:
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    "recipe_ingredient",
+                    queryset=RecipeIngredient.objects.select_related(
+                        "ingredient"
+                    ),
+                )
+            )
+        if "text" not in fields:
+            queryset = queryset.defer("text")
 
-    def perform_create(self, serializer):
-        tag_pk = self.request.data.pop("tags", [])
-        ingredients_list = self.request.data.pop("ingredients", [])
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset
+        annotations = {}
+        if "is_favorited" in fields:
+            annotations["is_favorited"] = Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef("pk"))
+            )
+        if "is_in_shopping_cart" in fields:
+            annotations["is_in_shopping_cart"] = Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef("pk"))
+            )
+        if "author" in fields:
+            annotations["author_is_subscribed"] = Exists(
+                Subscription.objects.filter(
+                    user=user, author=OuterRef("author")
+                )
+            )
+        return queryset.annotate(**annotations)
 
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault("fields", self.get_requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_tags(self):
+        tag_pk = self.request.data.get("tags")
         if not tag_pk:
             raise serializers.ValidationError({"tags": ["Обязательное поле."]})
-        if not ingredients_list:
-            raise serializers.ValidationError(
-                {"ingredients": ["Обязательное поле."]}
-            )
+        return Tag.objects.filter(pk__in=tag_pk)
 
-        tags = Tag.objects.filter(pk__in=tag_pk)
-        recipe = serializer.save()
-        for ingredient in ingredients_list:
-            amount = int(ingredient["amount"])
-            ingredient_obj = get_object_or_404(Ingredient, pk=ingredient["id"])
-            RecipeIngredient.objects.create(
-                recipe=recipe, ingredient=ingredient_obj, amount=amount
-            )
-        recipe.tags.set(tags)
-
-    def partial_update(self, request, *args, **kwargs):
-        recipe = get_object_or_404(Recipe, pk=kwargs["pk"])
-        if "tags" in request.data.keys():
-            if not request.data["tags"]:
-                raise serializers.ValidationError(
-                    {"tags": ["Обязательное поле."]}
-                )
-            tag_pk = self.request.data.pop("tags", [])
-            tags = Tag.objects.filter(pk__in=tag_pk)
-            recipe.tags.set(tags)
-
-        ingredients_list = self.request.data.pop("ingredients", [])
-        for ingredient in ingredients_list:
-            amount = int(ingredient["amount"])
-            if amount < 1:
-                raise serializers.ValidationError(
-                    {
-                        "amount": [
-                            "Убедитесь, что это значение больше либо равно 1."
-                        ]
-                    }
-                )
-            ingredient_obj = get_object_or_404(Ingredient, pk=ingredient["id"])
+    def perform_create(self, serializer):
+        recipe = serializer.save(tags=self.get_tags())
+        serializer.instance = self.get_queryset().get(pk=recipe.pk)
 
-            recipe_ingredient, create = RecipeIngredient.objects.get_or_create(
-                recipe=recipe,
-                ingredient=ingredient_obj,
-                defaults={"amount": amount},
-            )
+    def perform_update(self, serializer):
+        if serializer.partial and "tags" not in self.request.data:
+            recipe = serializer.save()
+        else:
+            recipe = serializer.save(tags=self.get_tags())
+        serializer.instance = self.get_queryset().get(pk=recipe.pk)
 
-            if not create:
-                recipe_ingredient.amount = amount
-                recipe_ingredient.save()
 
-        return super().partial_update(request, *args, **kwargs)
+class FeedViewSet(RecipeViewSet):
+    """Рецепты авторов, на которых подписан пользователь, новые первыми."""
+
+    pagination_class = FeedPagination
+    filter_backends = ()
+    permission_classes = [
+        IsAuthenticated,
+    ]
+    paginator = generics.GenericAPIView.paginator
 
 
+@method_decorator(condition(etag_func=ingredients_etag), name="list")
+@method_decorator(condition(etag_func=ingredients_etag), name="retrieve")
 class IngredientViewSet(viewsets.ModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     http_method_names = ["get"]
     pagination_class = None
-    filter_backends = (filters.SearchFilter,)
-    search_fields = ("^name",)
+    authentication_classes = []
+
+    def list(self, request, *args, **kwargs):
+        if (
+            is_full_ingredients_list(request)
+            and request.accepted_renderer.format == "json"
+        ):
+            use_gzip = accepts_gzip(request)
+            response = HttpResponse(
+                ingredient_catalog.get_content(use_gzip),
+                content_type="application/json",
+            )
+            if use_gzip:
+                response["Content-Encoding"] = "gzip"
+            patch_vary_headers(response, ("Accept-Encoding",))
+            return response
+        limit = request.query_params.get("limit", "")
+        ingredients = ingredient_catalog.search(
+            request.query_params.get(api_settings.SEARCH_PARAM, ""),
+            limit=int(limit) if limit.isdigit() else None,
+        )
+        return Response(ingredients)
 
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs["pk"]
+        ingredient = ingredient_catalog.get(int(pk)) if pk.isdigit() else None
+        if ingredient is None:
+            raise Http404
+        return Response(ingredient)
 
-class SubscribesListView(generics.ListAPIView):
-    serializer_class = SubscriptionsSerializer
-    pagination_class = PageLimitPagination
-    permission_classes = [
-        IsAuthenticated,
-    ]
 
-    def get_queryset(self):
+class SubscriptionAuthorsMixin:
+    """
+    Авторы с количеством рецептов, флагом подписки и не более
+    recipes_limit последними рецептами каждого автора.
+    """
+
+    def get_recipes_queryset(self):
+        recipes = Recipe.objects.only(
+            "id", "name", "image", "image_variants", "cooking_time", "author"
+        )
+        recipes_limit = self.request.query_params.get("recipes_limit")
+        if recipes_limit and recipes_limit.isdigit():
+            recipes = recipes.filter(
+                pk__in=Subquery(
+                    Recipe.objects.filter(author=OuterRef("author")).values(
+                        "pk"
+                    )[: int(recipes_limit)]
+                )
+            )
+        return recipes
+
+    def get_authors_queryset(self):
         return (
-            User.objects.filter(following__user=self.request.user)
-            .prefetch_related("following", "recipes")
-            .annotate(recipes_count=Count("recipes"))
+            User.objects.annotate(
+                is_subscribed=Exists(
+                    Subscription.objects.filter(
+                        user=self.request.user, author=OuterRef("pk")
+                    )
+                ),
+            )
+            .prefetch_related(
+                Prefetch("recipes", queryset=self.get_recipes_queryset())
+            )
+            .order_by("username")
         )
 
 
-class SubscribeUnsubscribeView(
-    generics.CreateAPIView, generics.DestroyAPIView
-):
+class SubscribesListView(SubscriptionAuthorsMixin, generics.ListAPIView):
     serializer_class = SubscriptionsSerializer
+    pagination_class = PageLimitPagination
     permission_classes = [
         IsAuthenticated,
     ]
 
-    def post(self, request, *args, **kwargs):
-        author = get_object_or_404(User, id=kwargs["id"])
-        user = self.request.user
+    def get_queryset(self):
+        return self.get_authors_queryset().filter(
+            following__user=self.request.user
+        )
+
+
+class SubscribeUnsubscribeView(SubscriptionAuthorsMixin, AsyncAPIView):
+    def create(self, request, id):
+        author = get_object_or_404(User, id=id)
+        user = request.user
         if author == user:
             return Response(
                 {"errors": "Нельзя подписаться на самого себя."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        subscription, create = Subscription.objects.get_or_create(
-            user=user, author=author
-        )
+        with transaction.atomic():
+            lock_user_relations(user.pk)
+            subscription, create = Subscription.objects.get_or_create(
+                user=user, author=author
+            )
         if not create:
             return Response(
                 {"errors": "Подписка уже существует."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        author = User.objects.annotate(recipes_count=Count("recipes")).get(
-            id=author.id
-        )
-        serializer = self.get_serializer(
-            author, context={"request": self.request}
+        author = self.get_authors_queryset().get(id=author.id)
+        serializer = SubscriptionsSerializer(
+            author, context={"request": request}
         )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-    def delete(self, request, *args, **kwargs):
+    def destroy(self, request, id):
         deleted = Subscription.objects.filter(
-            author__id=kwargs["id"], user=self.request.user
+            author__id=id, user=request.user
         ).delete()
         if deleted[0] == 0:
             return Response(
@@ -184,31 +443,27 @@ class SubscribeUnsubscribeView(
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class FavoriteView(generics.CreateAPIView, generics.DestroyAPIView):
-    serializer_class = RecipeSubscriptionSerializer
-    permission_classes = [
-        IsAuthenticated,
-    ]
-
-    def post(self, request, *args, **kwargs):
-        recipe = get_object_or_404(Recipe, id=kwargs["id"])
-        user = self.request.user
-        favorite, create = Favorite.objects.get_or_create(
-            user=user, recipe=recipe
-        )
+class FavoriteView(AsyncAPIView):
+    def create(self, request, id):
+        recipe = get_object_or_404(Recipe, id=id)
+        with transaction.atomic():
+            lock_user_relations(request.user.pk)
+            favorite, create = Favorite.objects.get_or_create(
+                user=request.user, recipe=recipe
+            )
         if not create:
             return Response(
                 {"errors": "Рецепт уже в избранном."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        serializer = self.get_serializer(
-            recipe, context={"request": self.request}
+        serializer = RecipeSubscriptionSerializer(
+            recipe, context={"request": request}
         )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-    def delete(self, request, *args, **kwargs):
+    def destroy(self, request, id):
         deleted = Favorite.objects.filter(
-            user=self.request.user, recipe__id=kwargs["id"]
+            user=request.user, recipe__id=id
         ).delete()
         if deleted[0] == 0:
             return Response(
@@ -218,99 +473,85 @@ class FavoriteView(generics.CreateAPIView, generics.DestroyAPIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+@method_decorator(condition(etag_func=shopping_cart_etag), name="get")
 class ShoppingCartView(APIView):
     permission_classes = [
         IsAuthenticated,
     ]
 
     def get_ingredients_list(self):
-        ingredients_list = []
-        user = self.request.user
-
-        recipe_ingredient_values = RecipeIngredient.objects.filter(
-            recipe__shopping_cart__user=user
-        ).values("ingredient__name", "ingredient__measurement_unit", "amount")
-
-        grouped_values = {}
-
-        for value in recipe_ingredient_values:
-            ingredient_name = value["ingredient__name"]
-            amount = value["amount"]
+        return [
+            f"\u2611   {item['name']} ({item['measurement_unit']}) "
+            f"- {item['amount']}"
+            for item in get_request_shopping_list(self.request)
+        ]
+
+    def perform_content_negotiation(self, request, force=False):
+        """
+        Параметр format выбирает формат выгрузки, а не рендерер DRF.
+        """
+        return super().perform_content_negotiation(request, force=True)
 
-            if ingredient_name not in grouped_values:
-                grouped_values[ingredient_name] = {
-                    "ingredient__measurement_unit": value[
-                        "ingredient__measurement_unit"
-                    ],
-                    "amount": 0,
-                }
-
-            grouped_values[ingredient_name]["amount"] += amount
-
-        for ingredient_name, value in grouped_values.items():
-            measurement_unit = value["ingredient__measurement_unit"]
-            total_amount = value["amount"]
-
-            string = (
-                f"\u2611   {ingredient_name} ({measurement_unit}) "
-                f"- {total_amount}"
+    def get(self, request, *args, **kwargs):
+        format = get_shopping_cart_format(request)
+        if format != "pdf":
+            return self.export(request, format)
+        date = get_shopping_cart_date()
+        key = f"shopping_cart_pdf:{shopping_cart_etag(request)}"
+        content = cache.get(key)
+        if content is None:
+            content = render_pdf(
+                f"Ваш список покупок на сегодня {date}",
+                self.get_ingredients_list(),
             )
-            ingredients_list.append(string)
-
-        return ingredients_list
+            cache.set(key, content, SHOPPING_LIST_TIMEOUT)
+        return FileResponse(
+            BytesIO(content),
+            as_attachment=True,
+            filename=f"shopping_cart_{date}.pdf",
+            content_type="application/pdf",
+        )
 
-    def get(self, request, *args, **kwargs):
-        date = datetime.datetime.now().strftime("%d-%m-%y")
-        response = HttpResponse(content_type="application/pdf; charset=utf-8")
-        response[
-            "Content-Disposition"
-        ] = f'attachment; filename="shopping_cart_{date}.pdf"'
-        pdfmetrics.registerFont(TTFont("Verdana", "fonts/Verdana.ttf"))
-        page = canvas.Canvas(response)
-
-        page.setFont("Verdana", 20)
-        title = f"Ваш список покупок на сегодня {date}"
-        page.drawString(60, 750, title)
-        page.line(60, 730, 500, 730)
-
-        page.setFont("Verdana", 12)
-        data = self.get_ingredients_list()
-        y = 670
-        for string in data:
-            page.drawString(60, y, string)
-            y -= 30
-        page.showPage()
-        page.save()
+    def export(self, request, format):
+        """
+        Список покупок в формате txt, csv или json. Строки
+        отдаются частями StreamingHttpResponse по мере формирования.
+        """
+        if format not in EXPORT_FORMATS:
+            raise NotFound
+        content_type, export = EXPORT_FORMATS[format]
+        response = StreamingHttpResponse(
+            export(get_request_shopping_list(request)),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = (
+            "attachment; "
+            f'filename="shopping_cart_{get_shopping_cart_date()}.{format}"'
+        )
         return response
 
 
-class ShoppingCartCreateDeleteView(
-    generics.CreateAPIView, generics.DestroyAPIView
-):
-    serializer_class = RecipeSubscriptionSerializer
-    permission_classes = [
-        IsAuthenticated,
-    ]
-
-    def post(self, request, *args, **kwargs):
-        recipe = get_object_or_404(Recipe, id=kwargs["id"])
-        user = self.request.user
-        shopping_cart, create = ShoppingCart.objects.get_or_create(
-            user=user, recipe=recipe
-        )
+class ShoppingCartCreateDeleteView(AsyncAPIView):
+    def create(self, request, id):
+        recipe = get_object_or_404(Recipe, id=id)
+        with transaction.atomic():
+            lock_user_relations(request.user.pk)
+            shopping_cart, create = ShoppingCart.objects.get_or_create(
+                user=request.user, recipe=recipe
+            )
         if not create:
             return Response(
                 {"errors": "Рецепт уже в списке покупок."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        serializer = self.get_serializer(
-            recipe, context={"request": self.request}
+        serializer = RecipeSubscriptionSerializer(
+            recipe, context={"request": request}
         )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-    def delete(self, request, *args, **kwargs):
+    def destroy(self, request, id):
         deleted = ShoppingCart.objects.filter(
-            user=self.request.user, recipe__id=kwargs["id"]
+            user=request.user, recipe__id=id
         ).delete()
         if deleted[0] == 0:
             return Response(
@@ -320,5 +561,188 @@ class ShoppingCartCreateDeleteView(
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class BatchRelationView(AsyncAPIView):
+    """
+    Добавление (POST) и удаление (DELETE) связей пользователя сразу
+    с несколькими объектами: {"ids": [1, 2, 3]}. Объекты проверяются
+    одним запросом, связи вставляются одним запросом bulk_create.
+    В ответе результат для каждого id: код, как у запроса
+    с одним объектом, и текст ошибки.
+    Связи пользователя меняются под блокировкой lock_user_relations,
+    как и в запросах с одним объектом, поэтому связь, которую успел
+    создать параллельный запрос, получает код 400. bulk_create
+    не отправляет сигналы, и after_create вызывает те же функции,
+    что и сигналы; удаление отправляет сигналы post_delete.
+    """
+
+    model = None
+    field = None
+    target_model = None
+    exists_message = None
+    missing_message = None
+
+    def get_ids(self, request):
+        serializer = BatchIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return list(dict.fromkeys(serializer.validated_data["ids"]))
+
+    def get_targets(self, ids):
+        return self.target_model.objects.only("pk").in_bulk(ids)
+
+    def get_relations(self, request, ids):
+        return self.model.objects.filter(
+            user=request.user, **{f"{self.field}_id__in": ids}
+        )
+
+    def get_related_ids(self, relations):
+        return set(relations.values_list(f"{self.field}_id", flat=True))
+
+    def check_target(self, request, target):
+        """Текст ошибки, если связь с target создать нельзя."""
+        return None
+
+    def get_result(self, id, status_code, errors=None):
+        result = {"id": id, "status": status_code}
+        if errors is not None:
+            result["errors"] = errors
+        return result
+
+    def create(self, request):
+        ids = self.get_ids(request)
+        targets = self.get_targets(ids)
+        with transaction.atomic():
+            lock_user_relations(request.user.pk)
+            existing = self.get_related_ids(self.get_relations(request, ids))
+            results = []
+            created = []
+            for id in ids:
+                target = targets.get(id)
+                if target is None:
+                    results.append(
+                        self.get_result(
+                            id,
+                            status.HTTP_404_NOT_FOUND,
+                            NotFound.default_detail,
+                        )
+                    )
+                    continue
+                errors = self.check_target(request, target)
+                if errors is None and id in existing:
+                    errors = self.exists_message
+                if errors is not None:
+                    results.append(
+                        self.get_result(
+                            id, status.HTTP_400_BAD_REQUEST, errors
+                        )
+                    )
+                    continue
+                created.append(target)
+                results.append(self.get_result(id, status.HTTP_201_CREATED))
+            if created:
+                self.model.objects.bulk_create(
+                    (
+                        self.model(user=request.user, **{self.field: target})
+                        for target in created
+                    ),
+                    ignore_conflicts=True,
+                )
+                # Связи, которые вставил этот запрос.
+                inserted = self.get_related_ids(
+                    self.get_relations(
+                        request, [target.pk for target in created]
+                    )
+                )
+                self.after_create(
+                    request,
+                    [target for target in created if target.pk in inserted],
+                )
+        return Response({"results": results})
+
+    def destroy(self, request):
+        ids = self.get_ids(request)
+        with transaction.atomic():
+            lock_user_relations(request.user.pk)
+            deleted = self.get_related_ids(self.get_relations(request, ids))
+            if deleted:
+                self.get_relations(request, deleted).delete()
+        return Response(
+            {
+                "results": [
+                    self.get_result(id, status.HTTP_204_NO_CONTENT)
+                    if id in deleted
+                    else self.get_result(
+                        id, status.HTTP_400_BAD_REQUEST, self.missing_message
+                    )
+                    for id in ids
+                ]
+            }
+        )
+
+    def after_create(self, request, targets):
+        pass
+
+
+class FavoriteBatchView(BatchRelationView):
+    model = Favorite
+    field = "recipe"
+    target_model = Recipe
+    exists_message = "Рецепт уже в избранном."
+    missing_message = "Вы ещё не добавили этот рецепт в избранное."
+
+    def after_create(self, request, targets):
+        favorites_changed([recipe.pk for recipe in targets])
+
+
+class ShoppingCartBatchView(BatchRelationView):
+    model = ShoppingCart
+    field = "recipe"
+    target_model = Recipe
+    exists_message = "Рецепт уже в списке покупок."
+    missing_message = "Вы ещё не добавили этот рецепт в список покупок."
+
+    def after_create(self, request, targets):
+        schedule_cart_changed([request.user.pk])
+
+
+class SubscribeBatchView(BatchRelationView):
+    model = Subscription
+    field = "author"
+    target_model = User
+    exists_message = "Подписка уже существует."
+    missing_message = "Вы не подписаны на этого автора."
+
+    def get_targets(self, ids):
+        return User.objects.only("pk").in_bulk(ids)
+
+    def check_target(self, request, target):
+        if target == request.user:
+            return "Нельзя подписаться на самого себя."
+        return None
+
+    def after_create(self, request, targets):
+        subscriptions_created(request.user.pk, targets)
+
+
+class MetricsView(APIView):
+    permission_classes = [
+        IsAdminUser,
+    ]
+
+    def get(self, request, *args, **kwargs):
+        content, content_type = render_metrics()
+        return HttpResponse(content, content_type=content_type)
+
+
 class UsersListView(UserViewSet):
     pagination_class = PageLimitPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset
+        return queryset.annotate(
+            is_subscribed=Exists(
+                Subscription.objects.filter(user=user, author=OuterRef("pk"))
+            )
+        )
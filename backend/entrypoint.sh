@@ -2,6 +2,19 @@
 
 python manage.py makemigrations --noinput
 python manage.py migrate --noinput
+python manage.py update_counters
 python manage.py collectstatic --noinput
 cp -r collected_static/* backend_static/
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+# Асинхронные эндпоинты (избранное, список покупок, подписки)
+# обслуживает ASGI-сервер на порту 8001, остальные - WSGI на 8000.
+# ASGI_WORKERS=0 отключает ASGI-сервер, nginx тогда отправляет
+# все запросы на 8000.
+ASGI_WORKERS=${ASGI_WORKERS:-2}
+if [ "$ASGI_WORKERS" -gt 0 ]; then
+    gunicorn --bind 0.0.0.0:8001 --workers "$ASGI_WORKERS" \
+        --worker-class uvicorn.workers.UvicornWorker foodgram_backend.asgi &
+fi
 gunicorn --bind 0.0.0.0:8000 foodgram_backend.wsgi
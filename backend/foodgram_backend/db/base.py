@@ -0,0 +1,40 @@
+from functools import partial
+
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base
+
+from .pool import close_all, get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL с пулом соединений процесса. Новое соединение берётся
+    из пула, а при закрытии (в конце запроса при CONN_MAX_AGE = 0)
+    возвращается в тот же пул. Настройки пула - ключ POOL в DATABASES.
+    Соединение без базы (NO_DB_ALIAS) нужно для CREATE и DROP DATABASE:
+    оно не берётся из пула, а перед ним закрываются все пулы процесса,
+    иначе их свободные соединения не дают удалить базу.
+    """
+
+    connection_pool = None
+
+    def get_new_connection(self, conn_params):
+        if self.alias == NO_DB_ALIAS:
+            close_all()
+            return super().get_new_connection(conn_params)
+        self.connection_pool = get_pool(
+            self.alias, conn_params, self.settings_dict["POOL"]
+        )
+        connection = self.connection_pool.acquire(
+            partial(super().get_new_connection, conn_params)
+        )
+        self.isolation_level = self.settings_dict["OPTIONS"].get(
+            "isolation_level", connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is None or self.connection_pool is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            self.connection_pool.release(self.connection)
@@ -0,0 +1,237 @@
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from prometheus_client import Counter, Gauge, Histogram
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from django.db import OperationalError
+
+
+POOL_WAIT = Histogram(
+    "foodgram_db_pool_wait_seconds",
+    "Время получения соединения из пула.",
+    ("alias",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10),
+)
+POOL_EVENTS = Counter(
+    "foodgram_db_pool_events",
+    "Соединения пула: created, reused, discarded, timeout.",
+    ("alias", "event"),
+)
+POOL_CONNECTIONS = Gauge(
+    "foodgram_db_pool_connections",
+    "Открытые соединения пула: in_use и idle.",
+    ("alias", "state"),
+    multiprocess_mode="livesum",
+)
+
+pools = {}
+pools_lock = threading.Lock()
+pools_pid = None
+
+
+class ConnectionPool:
+    """
+    Ограниченный пул соединений psycopg2 одного процесса.
+    Не больше size открытых соединений; если все заняты, acquire ждёт
+    освобождения до timeout секунд. Соединение закрывается, если оно
+    открыто дольше max_lifetime или простаивает дольше idle_timeout.
+    При выдаче из пула соединение проверяется запросом SELECT 1.
+    После close() свободные соединения закрыты, а занятые
+    закрываются при возврате.
+    """
+
+    def __init__(
+        self, alias, size, timeout, max_lifetime, idle_timeout, health_check
+    ):
+        self.alias = alias
+        self.size = size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.idle_timeout = idle_timeout
+        self.health_check = health_check
+        self.condition = threading.Condition()
+        self.idle = deque()
+        self.created_at = {}
+        self.opened = 0
+        self.closed = False
+
+    def acquire(self, connect):
+        """
+        Соединение из пула или новое, созданное вызовом connect().
+        Если свободных соединений нет, ждёт освобождения.
+        """
+        started = time.monotonic()
+        try:
+            while True:
+                connection = self.checkout(started)
+                if connection is None:
+                    return self.create(connect)
+                if self.is_usable(connection):
+                    POOL_EVENTS.labels(self.alias, "reused").inc()
+                    return connection
+                self.discard(connection)
+        finally:
+            POOL_WAIT.labels(self.alias).observe(time.monotonic() - started)
+            self.update_gauges()
+
+    def checkout(self, started):
+        """
+        Свободное соединение или None, если можно открыть новое.
+        Свежие соединения берутся первыми, старые успевают устареть
+        по idle_timeout и закрываются.
+        """
+        with self.condition:
+            while True:
+                self.close_idle()
+                if self.idle:
+                    connection, _ = self.idle.pop()
+                    return connection
+                if self.opened < self.size:
+                    self.opened += 1
+                    return None
+                remaining = started + self.timeout - time.monotonic()
+                if remaining <= 0 or not self.condition.wait(remaining):
+                    POOL_EVENTS.labels(self.alias, "timeout").inc()
+                    raise OperationalError(
+                        f"Нет свободных соединений в пуле {self.alias} "
+                        f"за {self.timeout} с."
+                    )
+
+    def create(self, connect):
+        try:
+            connection = connect()
+        except Exception:
+            with self.condition:
+                self.opened -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.created_at[connection] = time.monotonic()
+        POOL_EVENTS.labels(self.alias, "created").inc()
+        return connection
+
+    def release(self, connection):
+        """Возвращает соединение в пул, откатив незавершённую транзакцию."""
+        if (
+            not connection.closed
+            and connection.info.transaction_status != TRANSACTION_STATUS_IDLE
+        ):
+            try:
+                connection.rollback()
+            except psycopg2.Error:
+                pass
+        if self.closed or connection.closed or self.is_expired(connection):
+            self.discard(connection)
+        else:
+            with self.condition:
+                self.idle.append((connection, time.monotonic()))
+                self.condition.notify()
+        self.update_gauges()
+
+    def discard(self, connection):
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+        with self.condition:
+            self.created_at.pop(connection, None)
+            self.opened -= 1
+            self.condition.notify()
+        POOL_EVENTS.labels(self.alias, "discarded").inc()
+
+    def close_idle(self, idle_timeout=None):
+        """
+        Закрывает простаивающие дольше idle_timeout (по умолчанию -
+        настройка пула). Вызывать под lock.
+        """
+        if idle_timeout is None:
+            idle_timeout = self.idle_timeout
+        now = time.monotonic()
+        while self.idle and now - self.idle[0][1] >= idle_timeout:
+            connection, _ = self.idle.popleft()
+            connection.close()
+            self.created_at.pop(connection, None)
+            self.opened -= 1
+            POOL_EVENTS.labels(self.alias, "discarded").inc()
+
+    def close(self):
+        """Закрывает свободные соединения и не принимает занятые обратно."""
+        with self.condition:
+            self.closed = True
+            self.close_idle(idle_timeout=0)
+            self.condition.notify_all()
+        self.update_gauges()
+
+    def is_expired(self, connection):
+        created_at = self.created_at.get(connection, 0)
+        return time.monotonic() - created_at > self.max_lifetime
+
+    def is_usable(self, connection):
+        if connection.closed or self.is_expired(connection):
+            return False
+        if not self.health_check:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            if not connection.autocommit:
+                connection.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def update_gauges(self):
+        with self.condition:
+            idle = len(self.idle)
+            in_use = self.opened - idle
+        POOL_CONNECTIONS.labels(self.alias, "idle").set(idle)
+        POOL_CONNECTIONS.labels(self.alias, "in_use").set(in_use)
+
+
+def get_pool(alias, conn_params, options):
+    """
+    Пул соединений для базы alias с параметрами подключения
+    conn_params. Если параметры изменились (например, NAME при создании
+    тестовой базы), прежний пул закрывается, и соединения к другой базе
+    больше не выдаются. Пулы создаются заново после fork, чтобы
+    процессы gunicorn не делили соединения родителя.
+    """
+    global pools_pid
+    key = tuple(
+        sorted((name, repr(value)) for name, value in conn_params.items())
+    )
+    with pools_lock:
+        if pools_pid != os.getpid():
+            pools.clear()
+            pools_pid = os.getpid()
+        pool_key, pool = pools.get(alias, (None, None))
+        if pool is not None and pool_key != key:
+            pool.close()
+            pool = None
+        if pool is None:
+            pool = ConnectionPool(
+                alias,
+                size=options["SIZE"],
+                timeout=options["TIMEOUT"],
+                max_lifetime=options["MAX_LIFETIME"],
+                idle_timeout=options["IDLE_TIMEOUT"],
+                health_check=options["HEALTH_CHECK"],
+            )
+            pools[alias] = (key, pool)
+        return pool
+
+
+def close_all():
+    """
+    Закрывает все пулы процесса: свободные соединения сразу, занятые -
+    при возврате. Следующие соединения открываются в новых пулах.
+    """
+    with pools_lock:
+        if pools_pid == os.getpid():
+            for _, pool in pools.values():
+                pool.close()
+        pools.clear()
@@ -22,6 +22,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "django_filters",
     "rest_framework.authtoken",
     "rest_framework",
@@ -32,6 +33,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -61,14 +63,65 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "foodgram_backend.wsgi.application"
 
-DATABASES = {
+# DB_ENGINE=sqlite3 - база SQLite в файле DB_NAME (например, для
+# seed_benchmark и benchmark без PostgreSQL), по умолчанию - PostgreSQL.
+# DB_POOL_SIZE > 0 включает пул соединений процесса (foodgram_backend.db),
+# иначе соединение живёт DB_CONN_MAX_AGE секунд (0 - один запрос).
+DB_ENGINE = os.getenv("DB_ENGINE", "postgresql")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 0))
+
+if DB_ENGINE == "sqlite3":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.getenv("DB_NAME", BASE_DIR / "db.sqlite3"),
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": (
+                "foodgram_backend.db"
+                if DB_POOL_SIZE
+                else "django.db.backends.postgresql"
+            ),
+            "NAME": os.getenv("POSTGRES_DB", "foodgram"),
+            "USER": os.getenv("POSTGRES_USER", "foodgram"),
+            "PASSWORD": os.getenv("POSTGRES_PASSWORD", ""),
+            "HOST": os.getenv("DB_HOST", ""),
+            "PORT": os.getenv("DB_PORT", 5432),
+            "CONN_MAX_AGE": (
+                0 if DB_POOL_SIZE else int(os.getenv("DB_CONN_MAX_AGE", 0))
+            ),
+            "POOL": {
+                "SIZE": DB_POOL_SIZE,
+                "TIMEOUT": float(os.getenv("DB_POOL_TIMEOUT", 10)),
+                "MAX_LIFETIME": float(os.getenv("DB_POOL_MAX_LIFETIME", 1800)),
+                "IDLE_TIMEOUT": float(os.getenv("DB_POOL_IDLE_TIMEOUT", 300)),
+                "HEALTH_CHECK": os.getenv("DB_POOL_HEALTH_CHECK", "True")
+                == "True",
+            },
+        }
+    }
+
+# Кэш общий для всех процессов приложения (WSGI и ASGI): версии данных
+# в нём сбрасывают закэшированные ответы, списки покупок и токены
+# во всех процессах. Если memcached недоступен, кэш не используется.
+# С кэшем процесса (CACHE_BACKEND=...locmem.LocMemCache) данные,
+# которые должны сбрасываться сразу после записи, не кэшируются.
+CACHE_BACKEND = os.getenv(
+    "CACHE_BACKEND", "django.core.cache.backends.memcached.PyMemcacheCache"
+)
+
+CACHES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
-        "NAME": os.getenv("POSTGRES_DB", "foodgram"),
-        "USER": os.getenv("POSTGRES_USER", "foodgram"),
-        "PASSWORD": os.getenv("POSTGRES_PASSWORD", ""),
-        "HOST": os.getenv("DB_HOST", ""),
-        "PORT": os.getenv("DB_PORT", 5432),
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": os.getenv("CACHE_LOCATION", "127.0.0.1:11211"),
+        "OPTIONS": (
+            {"ignore_exc": True}
+            if CACHE_BACKEND.endswith("PyMemcacheCache")
+            else {}
+        ),
     }
 }
 
@@ -110,7 +163,7 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.AllowAny",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 6,
@@ -136,6 +189,22 @@ DJOSER = {
     "HIDE_USERS": False,
 }
 
+# Кэш токенов аутентификации: записей на процесс, срок жизни записи
+# в секундах и хранение записей в общем кэше Django.
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", 300))
+TOKEN_CACHE_SHARED = os.getenv("TOKEN_CACHE_SHARED", "False") == "True"
+
 RESERVED_USERNAMES = [
     "me",
 ]
+
+# Рецепты авторов, у которых подписчиков больше этого числа,
+# не раскладываются по лентам подписчиков, а читаются при запросе ленты.
+FEED_FANOUT_LIMIT = int(os.getenv("FEED_FANOUT_LIMIT", 10000))
+FEED_BACKFILL_LIMIT = int(os.getenv("FEED_BACKFILL_LIMIT", 100))
+
+# Процессы для сборки PDF списка покупок на процесс приложения
+# (0 - сборка в потоке запроса) и время ожидания сборки в секундах.
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", 0))
+PDF_TIMEOUT = float(os.getenv("PDF_TIMEOUT", 30))
@@ -53,7 +53,7 @@ class RecipeAdmin(admin.ModelAdmin):
         "text",
         "cooking_time",
         "pub_date",
-        "favorite_count",
+        "favorites_count",
     )
     inlines = [RecipeIngredientInline]
     search_fields = ["name"]
@@ -76,11 +76,6 @@ class RecipeAdmin(admin.ModelAdmin):
 
     display_image.short_description = "Image"
 
-    def favorite_count(self, obj):
-        return obj.favored_by.count()
-
-    favorite_count.short_description = "Добавлено в избранное"
-
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
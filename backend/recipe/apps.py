@@ -1,7 +1,20 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate, pre_migrate
 
 
 class RecipeConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "recipe"
     verbose_name = "Рецепты"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .cleanup import (
+            remove_duplicate_cart_items,
+            remove_duplicate_ingredients,
+        )
+        from .search import create_search_objects
+
+        pre_migrate.connect(remove_duplicate_cart_items, sender=self)
+        pre_migrate.connect(remove_duplicate_ingredients, sender=self)
+        post_migrate.connect(create_search_objects, sender=self)
@@ -0,0 +1,102 @@
+import logging
+from collections import defaultdict
+
+from django.db import connections, transaction
+
+
+logger = logging.getLogger(__name__)
+
+
+def remove_duplicate_cart_items(using, **kwargs):
+    """
+    Обработчик pre_migrate: удаляет повторные строки списка покупок,
+    оставляя самую раннюю для каждой пары (user, recipe). Раньше
+    уникальности у пары не было, и без очистки миграция
+    с ограничением uq_cart_user_recipe не применится.
+    """
+    from .models import ShoppingCart
+
+    connection = connections[using]
+    table = ShoppingCart._meta.db_table
+    with connection.cursor() as cursor:
+        if table not in connection.introspection.table_names(cursor):
+            return
+        cursor.execute(
+            f"""
+            DELETE FROM {table} WHERE id NOT IN (
+                SELECT MIN(id) FROM {table} GROUP BY user_id, recipe_id
+            )
+            """
+        )
+        if cursor.rowcount:
+            logger.warning(
+                "Удалено повторных строк списка покупок: %s", cursor.rowcount
+            )
+
+
+def remove_duplicate_ingredients(using, **kwargs):
+    """
+    Обработчик pre_migrate: объединяет ингредиенты с одинаковыми
+    названием и единицей измерения, которые создавал повторный запуск
+    старого import_csv. Остаётся ингредиент с наименьшим id, строки
+    рецептов переводятся на него. Если в рецепте было несколько
+    копий одного ингредиента, остаётся одна строка с суммой
+    количества. Без очистки миграция с ограничением
+    uq_ingredient_name_measurement_unit не применится.
+    """
+    from .models import Ingredient, RecipeIngredient
+
+    connection = connections[using]
+    ingredients = Ingredient._meta.db_table
+    recipe_ingredients = RecipeIngredient._meta.db_table
+    duplicates = f"""
+        FROM {ingredients} ingredient JOIN (
+            SELECT name, measurement_unit, MIN(id) AS id FROM {ingredients}
+            GROUP BY name, measurement_unit HAVING COUNT(*) > 1
+        ) kept ON kept.name = ingredient.name
+        AND kept.measurement_unit = ingredient.measurement_unit
+        WHERE ingredient.id <> kept.id
+    """
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        if ingredients not in connection.introspection.table_names(cursor):
+            return
+        cursor.execute(f"SELECT ingredient.id, kept.id {duplicates}")
+        survivors = dict(cursor.fetchall())
+        if not survivors:
+            return
+
+        cursor.execute(
+            f"""
+            SELECT id, recipe_id, ingredient_id, amount
+            FROM {recipe_ingredients} WHERE recipe_id IN (
+                SELECT recipe_id FROM {recipe_ingredients}
+                WHERE ingredient_id IN (SELECT ingredient.id {duplicates})
+            )
+            ORDER BY id
+            """
+        )
+        groups = defaultdict(list)
+        for pk, recipe_id, ingredient_id, amount in cursor.fetchall():
+            survivor = survivors.get(ingredient_id, ingredient_id)
+            groups[recipe_id, survivor].append((pk, ingredient_id, amount))
+        to_delete = []
+        to_update = []
+        for (recipe_id, survivor), rows in groups.items():
+            (pk, ingredient_id, amount), *rest = rows
+            if rest or ingredient_id != survivor:
+                to_delete.extend((row[0],) for row in rest)
+                total = amount + sum(row[2] for row in rest)
+                to_update.append((survivor, total, pk))
+        cursor.executemany(
+            f"DELETE FROM {recipe_ingredients} WHERE id = %s", to_delete
+        )
+        cursor.executemany(
+            f"UPDATE {recipe_ingredients} "
+            "SET ingredient_id = %s, amount = %s WHERE id = %s",
+            to_update,
+        )
+        cursor.execute(
+            f"DELETE FROM {ingredients} "
+            f"WHERE id IN (SELECT ingredient.id {duplicates})"
+        )
+        logger.warning("Объединено повторных ингредиентов: %s", len(survivors))
@@ -0,0 +1,28 @@
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(model, field):
+    """Количество строк model, у которых field ссылается на текущую."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        Value(0),
+    )
+
+
+def recount(model, field, related_model, related_field, pks):
+    """
+    Пересчитывает счётчик field у записей model с первичными ключами
+    pks одним запросом UPDATE. Нужен после массовых операций,
+    которые не отправляют сигналы.
+    """
+    if pks:
+        model.objects.filter(pk__in=pks).update(
+            **{field: count_subquery(related_model, related_field)}
+        )
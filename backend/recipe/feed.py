@@ -0,0 +1,122 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from users.models import Subscription, User
+
+from .models import FeedEntry, Recipe
+
+
+FEED_BATCH_SIZE = 1000
+
+
+def is_heavy_author(author_id):
+    """
+    Число подписчиков читается из базы: у автора из запроса
+    (кэшированный request.user) счётчик может быть устаревшим.
+    """
+    followers_count = (
+        User.objects.filter(pk=author_id)
+        .values_list("followers_count", flat=True)
+        .first()
+    )
+    return (followers_count or 0) > settings.FEED_FANOUT_LIMIT
+
+
+@transaction.atomic
+def fan_out_recipe(recipe):
+    """
+    Добавляет рецепт в ленты подписчиков автора пачками по
+    FEED_BATCH_SIZE строк и отмечает его как разложенный (fanned_out).
+    Рецепты авторов с большим числом подписчиков не раскладываются
+    и читаются в get_feed, даже если подписчиков потом станет меньше.
+    """
+    if is_heavy_author(recipe.author_id):
+        return
+    followers = (
+        Subscription.objects.filter(author_id=recipe.author_id)
+        .values_list("user_id", flat=True)
+        .iterator(chunk_size=FEED_BATCH_SIZE)
+    )
+    batch = []
+    for user_id in followers:
+        batch.append(
+            FeedEntry(
+                user_id=user_id,
+                recipe_id=recipe.pk,
+                author_id=recipe.author_id,
+                pub_date=recipe.pub_date,
+            )
+        )
+        if len(batch) == FEED_BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+    Recipe.objects.filter(pk=recipe.pk).update(fanned_out=True)
+
+
+def schedule_fan_out(recipe):
+    """Раскладывает рецепт по лентам после фиксации транзакции."""
+    transaction.on_commit(lambda: fan_out_recipe(recipe))
+
+
+def backfill_feed(user_id, author):
+    """
+    Добавляет в ленту подписчика последние разложенные рецепты автора.
+    Остальные рецепты автора get_feed читает сам.
+    """
+    recipes = Recipe.objects.filter(
+        author=author, fanned_out=True
+    ).values_list("pk", "pub_date")[: settings.FEED_BACKFILL_LIMIT]
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=user_id,
+                recipe_id=recipe_id,
+                author_id=author.pk,
+                pub_date=pub_date,
+            )
+            for recipe_id, pub_date in recipes
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def prune_feed(user_id, *author_ids):
+    """Удаляет из ленты подписчика рецепты авторов author_ids."""
+    FeedEntry.objects.filter(
+        user_id=user_id, author_id__in=author_ids
+    ).delete()
+
+
+def get_feed(user, limit, before=None):
+    """
+    Пары (pub_date, id) рецептов ленты, новые первыми.
+    before - (pub_date, id) последнего рецепта предыдущей страницы.
+    Лента читается из FeedEntry и дополняется неразложенными
+    рецептами подписок (fan-out on read).
+    """
+    entries = FeedEntry.objects.filter(user=user)
+    heavy_recipes = Recipe.objects.filter(
+        author__following__user=user, fanned_out=False
+    )
+    if before is not None:
+        pub_date, pk = before
+        entries = entries.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, recipe_id__lt=pk)
+        )
+        heavy_recipes = heavy_recipes.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk)
+        )
+    rows = set(
+        entries.order_by("-pub_date", "-recipe_id").values_list(
+            "pub_date", "recipe_id"
+        )[:limit]
+    )
+    rows.update(
+        heavy_recipes.order_by("-pub_date", "-id").values_list(
+            "pub_date", "id"
+        )[:limit]
+    )
+    return sorted(rows, reverse=True)[:limit]
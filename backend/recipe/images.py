@@ -0,0 +1,117 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+
+from api.versions import RECIPES_VERSION, bump_version
+
+
+logger = logging.getLogger(__name__)
+
+IMAGE_VARIANTS = {
+    "card": (740, 480),
+    "detail": (1280, 1280),
+}
+IMAGE_VARIANTS_DIR = "recipes/images/variants"
+IMAGE_VARIANTS_QUALITY = 80
+IMAGE_VARIANTS_WORKERS = 2
+
+executor = ThreadPoolExecutor(
+    max_workers=IMAGE_VARIANTS_WORKERS, thread_name_prefix="image-variants"
+)
+
+
+def to_rgb(image):
+    """Переводит изображение в RGB, прозрачные области заливает белым."""
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def make_image_variants(image_name):
+    """
+    Сохраняет уменьшенные копии изображения image_name в JPEG
+    и возвращает словарь {название варианта: путь в хранилище}.
+    """
+    with default_storage.open(image_name) as source:
+        image = to_rgb(Image.open(source))
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    variants = {}
+    for variant_name, size in IMAGE_VARIANTS.items():
+        variant = image.copy()
+        variant.thumbnail(size, Image.LANCZOS)
+        buffer = BytesIO()
+        variant.save(
+            buffer,
+            "JPEG",
+            quality=IMAGE_VARIANTS_QUALITY,
+            optimize=True,
+            progressive=True,
+        )
+        variants[variant_name] = default_storage.save(
+            f"{IMAGE_VARIANTS_DIR}/{stem}_{variant_name}.jpg",
+            ContentFile(buffer.getvalue()),
+        )
+    return variants
+
+
+def generate_image_variants(recipe_id, image_name):
+    from .models import Recipe
+
+    try:
+        variants = make_image_variants(image_name)
+        updated = Recipe.objects.filter(pk=recipe_id, image=image_name).update(
+            image_variants=variants
+        )
+        if not updated:
+            # Изображение рецепта успели заменить или рецепт удалён.
+            delete_files(variants.values())
+            return
+        bump_version(RECIPES_VERSION)
+    except Exception:
+        logger.exception(
+            "Не удалось подготовить варианты изображения %s.", image_name
+        )
+    finally:
+        connection.close()
+
+
+def schedule_image_variants(recipe):
+    """
+    Ставит подготовку вариантов изображения рецепта в очередь пула
+    после фиксации текущей транзакции.
+    """
+    recipe_id, image_name = recipe.pk, recipe.image.name
+    transaction.on_commit(
+        lambda: executor.submit(generate_image_variants, recipe_id, image_name)
+    )
+
+
+def delete_files(paths):
+    for path in paths:
+        default_storage.delete(path)
+
+
+def delete_image_variants(recipe):
+    delete_files(recipe.image_variants.values())
+
+
+def reset_image_variants(recipe):
+    """
+    Сбрасывает варианты прежнего изображения перед сохранением рецепта
+    с новым: до подготовки новых вариантов отдаются ссылки на оригинал,
+    файлы прежних удаляются после фиксации транзакции.
+    """
+    paths = list(recipe.image_variants.values())
+    recipe.image_variants = {}
+    transaction.on_commit(lambda: delete_files(paths))
@@ -1,45 +1,241 @@
 import csv
 import inspect
+import json
+import os
+import time
+from io import StringIO
+from itertools import islice
 
 from django.apps import apps
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.catalog import INGREDIENTS_VERSION
+from api.versions import TAGS_VERSION, bump_version
+from recipe.models import Ingredient, Tag
+
+
+DEFAULT_BATCH_SIZE = 5000
+JSON_CHUNK_SIZE = 64 * 1024
+NATURAL_KEYS = {
+    "Ingredient": ("name", "measurement_unit"),
+    "Tag": ("name",),
+}
+
+
+def read_csv(file):
+    yield from csv.DictReader(file)
+
+
+def read_json(file):
+    """Читает JSON-массив объектов по одному объекту, не загружая файл."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(JSON_CHUNK_SIZE).lstrip()
+    if not buffer.startswith("["):
+        raise CommandError("Ожидался JSON-массив объектов.")
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip().lstrip(",").lstrip()
+        if buffer.startswith("]"):
+            return
+        try:
+            obj, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = file.read(JSON_CHUNK_SIZE)
+            if not chunk:
+                raise CommandError("Некорректный JSON-файл.")
+            buffer += chunk
+            continue
+        yield obj
+        buffer = buffer[end:]
+
+
+def read_json_lines(file):
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+READERS = {
+    ".csv": read_csv,
+    ".json": read_json,
+    ".jsonl": read_json_lines,
+}
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
 
 
 class Command(BaseCommand):
     """
-    Менеджмент-команда для импорта из csv-файлов в базу данных.
+    Менеджмент-команда для импорта из csv- и json-файлов в базу данных.
     Пример использования в командной строке:
     python manage.py import_csv Ingredient ../data/ingredients.csv
     Ingredient - модель, в которую импортируем.
-    ../data/ingredients.csv - путь где находится csv-файл.
+    ../data/ingredients.csv - путь где находится csv-, json- или
+    jsonl-файл.
+    Файл читается потоково и загружается пачками по --batch-size строк.
+    Строки с уже существующим натуральным ключом (--key) обновляются,
+    поэтому команду можно запускать повторно. В PostgreSQL пачка
+    загружается через COPY во временную таблицу и переносится
+    одним INSERT ... ON CONFLICT.
     """
 
     def add_arguments(self, parser):
         parser.add_argument("model", type=str, help="Model name")
-        parser.add_argument("csv_file", type=str, help="CSV file path")
+        parser.add_argument("file_path", type=str, help="CSV/JSON file path")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Rows per batch",
+        )
+        parser.add_argument(
+            "--key", type=str, help="Natural key fields, comma separated"
+        )
 
     def handle(self, *args, **kwargs):
         model_name = kwargs["model"]
-        csv_file_path = kwargs["csv_file"]
+        file_path = kwargs["file_path"]
 
-        model_class = apps.get_model("recipe", model_name)
+        try:
+            model_class = apps.get_model("recipe", model_name)
+        except LookupError:
+            raise CommandError(f"Такой модели - {model_name} не найдено.")
 
-        if not model_class:
-            self.stdout.write(
-                self.style.ERROR(f"Такой модели - {model_name} не найдено.")
-            )
-            return
+        key = kwargs["key"]
+        key_fields = key.split(",") if key else NATURAL_KEYS.get(model_name)
+        if not key_fields:
+            raise CommandError("Укажите натуральный ключ модели в --key.")
+
+        extension = os.path.splitext(file_path)[1].lower()
+        reader = READERS.get(extension)
+        if reader is None:
+            raise CommandError(f"Неподдерживаемый формат файла: {extension}")
 
-        with open(csv_file_path, encoding="utf-8") as csv_file:
-            csv_reader = csv.DictReader(csv_file)
-            rows = []
-            for row in csv_reader:
-                rows.append(model_class(**row))
+        if connection.vendor == "postgresql":
+            loader = self.load_batch_copy
+        else:
+            loader = self.load_batch_orm
 
-            model_class.objects.bulk_create(rows)
+        started = time.monotonic()
+        total = 0
+        with open(file_path, encoding="utf-8") as file:
+            for batch in batches(reader(file), kwargs["batch_size"]):
+                with transaction.atomic():
+                    loader(model_class, key_fields, batch)
+                total += len(batch)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"Загружено строк: {total} "
+                    f"({total / elapsed:.0f} строк/с)."
+                )
+
+        # Массовая загрузка не отправляет сигналы, версии
+        # справочников увеличиваются здесь, после фиксации всех пачек.
+        if model_class is Ingredient:
+            bump_version(INGREDIENTS_VERSION)
+        elif model_class is Tag:
+            bump_version(TAGS_VERSION)
 
         self.stdout.write(self.style.SUCCESS("Данные успешно импортированы."))
 
+    def get_fields(self, model_class):
+        return [
+            field
+            for field in model_class._meta.concrete_fields
+            if not field.primary_key
+        ]
+
+    def load_batch_copy(self, model_class, key_fields, batch):
+        fields = self.get_fields(model_class)
+        columns = [field.column for field in fields]
+        key_columns = [
+            model_class._meta.get_field(name).column for name in key_fields
+        ]
+        update_columns = [
+            field.column
+            for field in fields
+            if field.name in batch[0] and field.name not in key_fields
+        ]
+
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        for row in batch:
+            obj = model_class(**row)
+            values = []
+            for field in fields:
+                value = field.get_prep_value(field.pre_save(obj, add=True))
+                values.append("\\N" if value is None else value)
+            writer.writerow(values)
+        buffer.seek(0)
+
+        qn = connection.ops.quote_name
+        table = qn(model_class._meta.db_table)
+        staging = qn(f"{model_class._meta.db_table}_import")
+        columns_sql = ", ".join(qn(column) for column in columns)
+        key_sql = ", ".join(qn(column) for column in key_columns)
+        if update_columns:
+            conflict_sql = "DO UPDATE SET " + ", ".join(
+                f"{qn(column)} = EXCLUDED.{qn(column)}"
+                for column in update_columns
+            )
+        else:
+            conflict_sql = "DO NOTHING"
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS {staging} "
+                f"ON COMMIT DELETE ROWS "
+                f"AS SELECT {columns_sql} FROM {table} WITH NO DATA"
+            )
+            cursor.copy_expert(
+                f"COPY {staging} ({columns_sql}) FROM STDIN "
+                f"WITH (FORMAT csv, NULL '\\N')",
+                buffer,
+            )
+            cursor.execute(
+                f"INSERT INTO {table} ({columns_sql}) "
+                f"SELECT DISTINCT ON ({key_sql}) {columns_sql} "
+                f"FROM {staging} ON CONFLICT ({key_sql}) {conflict_sql}"
+            )
+
+    def load_batch_orm(self, model_class, key_fields, batch):
+        update_fields = [
+            field.name
+            for field in self.get_fields(model_class)
+            if field.name in batch[0] and field.name not in key_fields
+        ]
+        rows = {tuple(row[name] for name in key_fields): row for row in batch}
+        existing = {
+            tuple(str(getattr(obj, name)) for name in key_fields): obj
+            for obj in model_class.objects.filter(
+                **{f"{key_fields[0]}__in": {key[0] for key in rows}}
+            )
+        }
+
+        to_create = []
+        to_update = []
+        for key, row in rows.items():
+            obj = existing.get(tuple(str(value) for value in key))
+            if obj is None:
+                to_create.append(model_class(**row))
+                continue
+            for name in update_fields:
+                setattr(obj, name, row[name])
+            to_update.append(obj)
+
+        if to_update and update_fields:
+            model_class.objects.bulk_update(to_update, update_fields)
+        if to_create:
+            model_class.objects.bulk_create(to_create)
+
 
 models = []
 
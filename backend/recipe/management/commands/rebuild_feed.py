@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from recipe.feed import backfill_feed
+from recipe.models import FeedEntry, Recipe
+from users.models import Subscription
+
+
+class Command(BaseCommand):
+    """
+    Менеджмент-команда для перестроения лент подписок (FeedEntry)
+    по текущим подпискам, например после массовой загрузки данных.
+    Рецепты авторов, у которых не больше FEED_FANOUT_LIMIT подписчиков,
+    отмечаются разложенными, и в ленту каждой подписки попадают
+    последние FEED_BACKFILL_LIMIT из них. Рецепты остальных авторов
+    читаются при выдаче ленты. Запускать после update_counters.
+    Пример использования в командной строке:
+    python manage.py rebuild_feed
+    """
+
+    def handle(self, *args, **kwargs):
+        with transaction.atomic():
+            FeedEntry.objects.all().delete()
+            heavy = Q(author__followers_count__gt=settings.FEED_FANOUT_LIMIT)
+            Recipe.objects.filter(heavy).update(fanned_out=False)
+            Recipe.objects.exclude(heavy).update(fanned_out=True)
+            subscriptions = Subscription.objects.select_related(
+                "author"
+            ).iterator()
+            for subscription in subscriptions:
+                backfill_feed(subscription.user_id, subscription.author)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Записей в лентах: {FeedEntry.objects.count()}."
+            )
+        )
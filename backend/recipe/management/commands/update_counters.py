@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from recipe.counters import count_subquery
+from recipe.models import Favorite, Recipe
+from users.models import Subscription, User
+
+
+COUNTERS = (
+    (Recipe, "favorites_count", Favorite, "recipe"),
+    (User, "recipes_count", Recipe, "author"),
+    (User, "followers_count", Subscription, "author"),
+)
+
+
+class Command(BaseCommand):
+    """
+    Менеджмент-команда для пересчёта счётчиков:
+    Recipe.favorites_count, User.recipes_count и User.followers_count.
+    Пример использования в командной строке:
+    python manage.py update_counters
+    """
+
+    def handle(self, *args, **kwargs):
+        with transaction.atomic():
+            for model, field, related_model, related_field in COUNTERS:
+                actual = count_subquery(related_model, related_field)
+                drifted = (
+                    model.objects.annotate(actual=actual)
+                    .exclude(**{field: F("actual")})
+                    .count()
+                )
+                if drifted:
+                    model.objects.update(**{field: actual})
+                self.stdout.write(
+                    f"{model.__name__}.{field}: исправлено записей - "
+                    f"{drifted}."
+                )
+
+        self.stdout.write(self.style.SUCCESS("Счётчики пересчитаны."))
@@ -3,11 +3,14 @@ import os
 from autoslug import AutoSlugField
 from unidecode import unidecode
 
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models import Q
 
-from users.models import User
+from users.models import CounterFieldsMixin, User
 
+from .images import delete_image_variants
 from .validators import hex_color_validator
 
 
@@ -41,7 +44,7 @@ class Tag(models.Model):
         return super().save(*args, **kwargs)
 
 
-class Recipe(models.Model):
+class Recipe(CounterFieldsMixin, models.Model):
     author = models.ForeignKey(
         User,
         on_delete=models.SET_DEFAULT,
@@ -51,6 +54,9 @@ class Recipe(models.Model):
     )
     name = models.CharField("Рецепт", max_length=MAX_LENGTH_RECIPE_NAME)
     image = models.ImageField("Изображение", upload_to="recipes/images/")
+    image_variants = models.JSONField(
+        "Варианты изображения", default=dict, editable=False
+    )
     text = models.TextField("Описание рецепта")
     ingredients = models.ManyToManyField(
         "Ingredient",
@@ -67,11 +73,36 @@ class Recipe(models.Model):
     pub_date = models.DateTimeField(
         "Дата публикации", auto_now_add=True, db_index=True
     )
+    favorites_count = models.PositiveIntegerField(
+        "Добавлено в избранное", default=0, editable=False
+    )
+    search_vector = SearchVectorField(
+        "Поисковый вектор", null=True, editable=False
+    )
+    fanned_out = models.BooleanField(
+        "Разложен по лентам", default=False, editable=False
+    )
+
+    counter_fields = ("favorites_count",)
 
     class Meta:
         ordering = ("-pub_date",)
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
+        indexes = [
+            models.Index(
+                fields=["-pub_date", "-id"], name="recipe_pub_date_id_idx"
+            ),
+            models.Index(
+                fields=["author", "-pub_date", "-id"],
+                name="recipe_author_pub_date_idx",
+            ),
+            models.Index(
+                fields=["author", "-pub_date", "-id"],
+                name="recipe_not_fanned_out_idx",
+                condition=Q(fanned_out=False),
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -79,6 +110,7 @@ class Recipe(models.Model):
     def delete(self, *args, **kwargs):
         if self.image:
             os.remove(self.image.path)
+        delete_image_variants(self)
         super().delete(*args, **kwargs)
 
 
@@ -101,6 +133,16 @@ class ShoppingCart(models.Model):
     class Meta:
         verbose_name = "Список покупок"
         verbose_name_plural = "Списки покупок"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "recipe"], name="uq_cart_user_recipe"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["recipe", "user"], name="cart_recipe_user_idx"
+            )
+        ]
 
     def __str__(self):
         return (
@@ -121,6 +163,12 @@ class Ingredient(models.Model):
         ordering = ("name",)
         verbose_name = "Ингредиент"
         verbose_name_plural = "Ингредиенты"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("name", "measurement_unit"),
+                name="uq_ingredient_name_measurement_unit",
+            )
+        ]
 
     def __str__(self):
         return self.name
@@ -190,3 +238,53 @@ class Favorite(models.Model):
             f"Рецепт {self.recipe.name} в избранном у "
             f"пользователя {self.user.first_name} {self.user.last_name}."
         )
+
+
+class FeedEntry(models.Model):
+    """
+    Рецепт в ленте подписок пользователя. Строки добавляются при
+    публикации рецепта (fan-out on write), поля author и pub_date
+    скопированы из рецепта, чтобы лента читалась одним диапазоном
+    индекса (user, -pub_date, -recipe).
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="feed",
+        verbose_name="Подписчик",
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Рецепт",
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Автор",
+    )
+    pub_date = models.DateTimeField("Дата публикации")
+
+    class Meta:
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Лента подписок"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "recipe"), name="uq_feed_user_recipe"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-pub_date", "-recipe"],
+                name="feed_user_pub_date_idx",
+            ),
+            models.Index(
+                fields=["user", "author"], name="feed_user_author_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.recipe} в ленте {self.user}."
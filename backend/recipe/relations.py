@@ -0,0 +1,68 @@
+from django.db import connection, transaction
+from django.db.models import F
+
+from users.models import Subscription, User
+
+from .counters import recount
+from .feed import backfill_feed, prune_feed
+from .models import Favorite, Recipe
+
+
+def lock_user_relations(user_id):
+    """
+    Блокирует строку пользователя до конца транзакции, чтобы связи
+    одного пользователя добавлялись по очереди и проверка существующих
+    связей перед вставкой оставалась верной. FOR NO KEY UPDATE
+    не мешает внешним ключам на эту строку.
+
+    В SQLite нет SELECT ... FOR UPDATE: пустой UPDATE сразу берёт
+    блокировку записи базы, и параллельные транзакции ждут её
+    (busy timeout), а не получают "database is locked" при переходе
+    от чтения к записи.
+    """
+    if not connection.features.has_select_for_update:
+        User.objects.filter(pk=user_id).update(id=F("id"))
+        return
+    list(
+        User.objects.select_for_update(no_key=True)
+        .filter(pk=user_id)
+        .values_list("pk", flat=True)
+    )
+
+
+def schedule_recount(model, field, related_model, related_field, pks):
+    """
+    Пересчитывает счётчик после фиксации транзакции: UPDATE строк
+    авторов и рецептов не ждёт блокировок, которые держит транзакция
+    со связями, и не пересчитывается по незафиксированным данным.
+    """
+    pks = list(pks)
+    transaction.on_commit(
+        lambda: recount(model, field, related_model, related_field, pks)
+    )
+
+
+def favorites_changed(recipe_ids):
+    """Избранное рецептов recipe_ids изменилось."""
+    schedule_recount(Recipe, "favorites_count", Favorite, "recipe", recipe_ids)
+
+
+def subscriptions_created(user_id, authors):
+    """Пользователь user_id подписался на авторов authors."""
+    schedule_recount(
+        User,
+        "followers_count",
+        Subscription,
+        "author",
+        [author.pk for author in authors],
+    )
+    for author in authors:
+        backfill_feed(user_id, author)
+
+
+def subscriptions_deleted(user_id, author_ids):
+    """Пользователь user_id отписался от авторов author_ids."""
+    schedule_recount(
+        User, "followers_count", Subscription, "author", author_ids
+    )
+    prune_feed(user_id, *author_ids)
@@ -0,0 +1,120 @@
+import logging
+from functools import lru_cache
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramSimilarity,
+)
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F, Q
+
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = "russian"
+
+
+def search_vector_sql(row=""):
+    """Выражение tsvector: название с весом A, описание с весом B."""
+    return (
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', "
+        f"coalesce({row}name, '')), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', "
+        f"coalesce({row}text, '')), 'B')"
+    )
+
+
+def get_search_sql(table):
+    return [
+        f"""
+        CREATE OR REPLACE FUNCTION {table}_search_vector_update()
+        RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {search_vector_sql("NEW.")};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        f"DROP TRIGGER IF EXISTS {table}_search_vector_trigger ON {table}",
+        f"""
+        CREATE TRIGGER {table}_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF name, text ON {table}
+        FOR EACH ROW EXECUTE FUNCTION {table}_search_vector_update()
+        """,
+        f"""
+        UPDATE {table} SET search_vector = {search_vector_sql()}
+        WHERE search_vector IS NULL
+        """,
+        f"""
+        CREATE INDEX IF NOT EXISTS {table}_search_vector_idx
+        ON {table} USING gin (search_vector)
+        """,
+    ]
+
+
+def get_trigram_sql(table):
+    return [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        f"""
+        CREATE INDEX IF NOT EXISTS {table}_name_trgm_idx
+        ON {table} USING gin (name gin_trgm_ops)
+        """,
+    ]
+
+
+def create_search_objects(using, **kwargs):
+    """
+    Обработчик post_migrate: триггер, который заполняет
+    Recipe.search_vector при записи, GIN-индексы по search_vector и
+    по триграммам названия. Миграции в репозитории не хранятся,
+    поэтому объекты создаются здесь, только в PostgreSQL.
+    Если расширение pg_trgm недоступно, поиск работает без опечаток.
+    """
+    from .models import Recipe
+
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return
+    table = Recipe._meta.db_table
+    with connection.cursor() as cursor:
+        for sql in get_search_sql(table):
+            cursor.execute(sql)
+        try:
+            with transaction.atomic(using=using):
+                for sql in get_trigram_sql(table):
+                    cursor.execute(sql)
+        except DatabaseError as error:
+            logger.warning("Триграммный индекс не создан: %s", error)
+    has_trigram.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def has_trigram(using):
+    with connections[using].cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def search_recipes(queryset, text):
+    """
+    Рецепты, найденные по названию и описанию, самые релевантные
+    первыми. В PostgreSQL - полнотекстовый поиск по search_vector
+    и, для опечаток, триграммное сходство названия. В других базах -
+    поиск подстроки.
+    """
+    if connections[queryset.db].vendor != "postgresql":
+        return queryset.filter(
+            Q(name__icontains=text) | Q(text__icontains=text)
+        )
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type="websearch")
+    condition = Q(search_vector=query)
+    rank = SearchRank(F("search_vector"), query)
+    if has_trigram(queryset.db):
+        condition |= Q(name__trigram_similar=text)
+        rank = rank + TrigramSimilarity("name", text)
+    return (
+        queryset.filter(condition)
+        .annotate(search_rank=rank)
+        .order_by("-search_rank", "-pub_date", "-id")
+    )
@@ -7,7 +7,15 @@ from .models import Subscription, User
 
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
-    list_display = ("username", "id", "email", "first_name", "last_name")
+    list_display = (
+        "username",
+        "id",
+        "email",
+        "first_name",
+        "last_name",
+        "recipes_count",
+        "followers_count",
+    )
     search_fields = ["username", "email"]
     fieldsets = (
         (
@@ -12,7 +12,35 @@ MAX_LENGHT_USER_PASSWORD = 150
 MAX_LENGHT_USER_USERNAME = 150
 
 
-class User(AbstractUser):
+class CounterFieldsMixin:
+    """
+    Модель со счётчиками counter_fields. Счётчики меняются только
+    запросами UPDATE с F() и пересчётом, а значение в объекте может
+    быть устаревшим, поэтому save() существующей записи без
+    update_fields записывает все поля, кроме счётчиков и отложенных.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            not args
+            and not self._state.adding
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                field.attname
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.attname not in deferred
+                and field.name not in self.counter_fields
+            ]
+        return super().save(*args, **kwargs)
+
+
+class User(CounterFieldsMixin, AbstractUser):
     username = models.CharField(
         max_length=MAX_LENGHT_USER_USERNAME,
         unique=True,
@@ -26,6 +54,14 @@ class User(AbstractUser):
     first_name = models.CharField("Имя", max_length=MAX_LENGHT_USER_FIRST)
     last_name = models.CharField("Фамилия", max_length=MAX_LENGHT_USER_LAST)
     password = models.CharField("Пароль", max_length=MAX_LENGHT_USER_PASSWORD)
+    recipes_count = models.PositiveIntegerField(
+        "Количество рецептов", default=0, editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        "Количество подписчиков", default=0, editable=False
+    )
+
+    counter_fields = ("recipes_count", "followers_count")
 
     class Meta:
         verbose_name = "Пользователь"
@@ -58,6 +94,11 @@ class Subscription(models.Model):
                 fields=["user", "author"], name="uq_user_author"
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["author", "user"], name="subscription_author_user_idx"
+            )
+        ]
 
     def __str__(self):
         return f"{self.user} подписан на {self.author}."